@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import pathlib
+import numpy
+import AgX
+import generate_config
+
+####
+# Global Configuration Variables
+####
+histogram_minimum_ev = -32.0
+histogram_maximum_ev = +32.0
+histogram_bins_per_stop = 16
+histogram_rows = 64
+od_middle_grey = 0.18
+
+# Percentiles of the exposure distribution proposed as the ends of the log2
+# range. The range always keeps at least exposure_minimum_stops either side of
+# middle grey, so that the curve pivot lies inside it.
+exposure_minimum_percentile = 0.1
+exposure_maximum_percentile = 99.9
+exposure_minimum_stops = 1.0
+
+
+# An empty histogram of log2 exposure relative to middle grey. Exposures
+# beyond the range accumulate in the end bins. Values the log2 allocation
+# floors, those at or below zero and NaNs, are counted separately.
+def empty_histogram(
+    minimum_ev=histogram_minimum_ev,
+    maximum_ev=histogram_maximum_ev,
+    bins_per_stop=histogram_bins_per_stop,
+    od_middle_grey=od_middle_grey
+):
+    bins = int(round((maximum_ev - minimum_ev) * bins_per_stop))
+
+    return {
+        "counts": numpy.zeros(bins, dtype=numpy.int64),
+        "minimum_ev": numpy.float64(minimum_ev),
+        "maximum_ev": numpy.float64(maximum_ev),
+        "od_middle_grey": numpy.float64(od_middle_grey),
+        "non_positive": numpy.int64(0)
+    }
+
+
+# Accumulate the exposure of every channel of a block of pixels into the
+# histogram. As in the view, negatives are clamped and the inset matrix
+# applied first, so the histogram describes what the log2 allocation sees.
+def accumulate_histogram(histogram, RGB, matrix=None):
+    RGB = numpy.maximum(
+        numpy.asarray(RGB)[..., :3].reshape(-1, 3), 0.0, dtype=numpy.float32
+    )
+    if matrix is not None:
+        RGB = RGB @ numpy.asarray(matrix, dtype=numpy.float32).T
+
+    counts = histogram["counts"]
+    bins = len(counts)
+    positive = RGB[RGB > 0.0]
+    histogram["non_positive"] += RGB.size - positive.size
+
+    index = numpy.log2(positive / numpy.float32(histogram["od_middle_grey"]))
+    index -= numpy.float32(histogram["minimum_ev"])
+    index *= numpy.float32(
+        bins / (histogram["maximum_ev"] - histogram["minimum_ev"])
+    )
+    numpy.clip(index, 0, bins - 1, out=index)
+    counts += numpy.bincount(index.astype(numpy.intp), minlength=bins)
+
+    return histogram
+
+
+# Accumulate an image file strip by strip from a memory map, so only rows
+# rows are ever resident whatever the frame size.
+def accumulate_file(
+    histogram,
+    path,
+    matrix=None,
+    shape=None,
+    file_dtype=numpy.float32,
+    layout="interleaved",
+    rows=histogram_rows
+):
+    if layout not in ("interleaved", "planar"):
+        raise ValueError("Unknown layout \"{}\".".format(layout))
+
+    image = AgX.open_image_memmap(path, shape, file_dtype, layout)
+    height = image.shape[1] if layout == "planar" else image.shape[0]
+
+    for start in range(0, height, rows):
+        stop = min(start + rows, height)
+        if layout == "planar":
+            strip = image[:3, start:stop].transpose(1, 2, 0)
+        else:
+            strip = image[start:stop]
+        accumulate_histogram(histogram, strip, matrix)
+
+    return histogram
+
+
+# Sum partial histograms, which must share their range, bins and middle grey.
+def merge_histograms(histograms):
+    histograms = list(histograms)
+    if not histograms:
+        return empty_histogram()
+
+    merged = {
+        name: value.copy() for name, value in histograms[0].items()
+    }
+    for histogram in histograms[1:]:
+        for name in ("minimum_ev", "maximum_ev", "od_middle_grey"):
+            if histogram[name] != merged[name]:
+                raise ValueError(
+                    "Cannot merge histograms with a different \"{}\".".format(
+                        name
+                    )
+                )
+        if len(histogram["counts"]) != len(merged["counts"]):
+            raise ValueError("Cannot merge histograms with different bins.")
+
+        merged["counts"] += histogram["counts"]
+        merged["non_positive"] += histogram["non_positive"]
+
+    return merged
+
+
+# Build the histogram of a sequence of frames. Frames are shared out across
+# worker threads, each accumulating its own partial histogram, which are
+# merged at the end. Memory is bounded by the strip size per worker.
+def analyse_frames(
+    paths,
+    compression=generate_config.AgX_compression,
+    workers=None,
+    **kwargs
+):
+    paths = list(paths)
+    matrix = AgX.AgX_compressed_matrix(compression)
+    partials = []
+
+    def analyse_share(indices):
+        histogram = empty_histogram()
+        for index in indices:
+            accumulate_file(histogram, paths[index], matrix, **kwargs)
+        partials.append(histogram)
+
+    AgX.run_chunked(len(paths), 1, workers, analyse_share)
+
+    return merge_histograms(partials)
+
+
+# Exposures at the given percentiles of the positive values, interpolated
+# linearly within bins.
+def histogram_percentiles(histogram, percentiles):
+    counts = histogram["counts"]
+    total = counts.sum()
+    if total == 0:
+        raise ValueError("The histogram holds no positive exposures.")
+
+    edges = numpy.linspace(
+        histogram["minimum_ev"], histogram["maximum_ev"], len(counts) + 1
+    )
+    cumulative = numpy.concatenate([[0], numpy.cumsum(counts)]) / total
+
+    return numpy.interp(
+        numpy.asarray(percentiles, dtype=numpy.float64) / 100.0,
+        cumulative,
+        edges
+    )
+
+
+# Propose the log2 exposure range from percentile targets, along with the
+# normalised pivot at which middle grey lands. build_config derives the pivot
+# from the range in the same way, so the range is all it needs.
+def propose_exposure_range(
+    histogram,
+    minimum_percentile=exposure_minimum_percentile,
+    maximum_percentile=exposure_maximum_percentile,
+    minimum_stops=exposure_minimum_stops
+):
+    minimum_ev, maximum_ev = histogram_percentiles(
+        histogram, [minimum_percentile, maximum_percentile]
+    )
+    minimum_ev = float(min(minimum_ev, -minimum_stops))
+    maximum_ev = float(max(maximum_ev, minimum_stops))
+    total_exposure = maximum_ev - minimum_ev
+
+    return {
+        "minimum_ev": minimum_ev,
+        "maximum_ev": maximum_ev,
+        "x_pivot": abs(minimum_ev / total_exposure),
+        "non_positive_fraction": float(
+            histogram["non_positive"] / max(
+                histogram["non_positive"] + histogram["counts"].sum(), 1
+            )
+        )
+    }
+
+
+def save_histogram(path, histogram):
+    numpy.savez(path, **histogram)
+
+
+def load_histogram(path):
+    with numpy.load(path) as loaded:
+        return {name: loaded[name] for name in loaded.files}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Analyse the exposure of footage and propose the AgX "
+        "log2 range."
+    )
+    parser.add_argument("frames", nargs="*")
+    parser.add_argument(
+        "--shape", type=int, nargs=3, default=None,
+        metavar=("HEIGHT", "WIDTH", "CHANNELS"),
+        help="The shape of raw frames. NumPy frames carry their own."
+    )
+    parser.add_argument(
+        "--file-dtype", default="float32",
+        help="The data type of raw frames."
+    )
+    parser.add_argument(
+        "--layout", choices=["interleaved", "planar"], default="interleaved"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--merge", nargs="+", default=[],
+        help="Partial histograms to merge with the analysed frames."
+    )
+    parser.add_argument(
+        "--save", default=None,
+        help="Write the merged histogram, for merging with other partials."
+    )
+    parser.add_argument(
+        "--minimum-percentile", type=float,
+        default=exposure_minimum_percentile
+    )
+    parser.add_argument(
+        "--maximum-percentile", type=float,
+        default=exposure_maximum_percentile
+    )
+    parser.add_argument(
+        "--config-directory", default=None,
+        help="Also generate a complete config using the proposed range."
+    )
+    args = parser.parse_args()
+
+    histogram = merge_histograms(
+        [
+            analyse_frames(
+                args.frames,
+                workers=args.workers,
+                shape=args.shape,
+                file_dtype=numpy.dtype(args.file_dtype),
+                layout=args.layout
+            )
+        ]
+        + [load_histogram(path) for path in args.merge]
+    )
+
+    if args.save is not None:
+        save_histogram(args.save, histogram)
+        print("Wrote histogram \"{}\"".format(pathlib.Path(args.save)))
+
+    proposal = propose_exposure_range(
+        histogram,
+        args.minimum_percentile,
+        args.maximum_percentile
+    )
+    print(json.dumps(proposal, indent=2))
+
+    if args.config_directory is not None:
+        generate_config.build_config(
+            output_directory=args.config_directory,
+            minimum_ev=proposal["minimum_ev"],
+            maximum_ev=proposal["maximum_ev"]
+        )
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import numpy
+import pathlib
+import PyOpenColorIO
+import AgX
+import generate_config
+import processor_cache
+
+####
+# Global Configuration Variables
+####
+cache_directory = "./cache/LUTs/"
+source_colourspace = "Linear BT.709"
+
+LUT_size = 65
+LUT_od_middle_grey = 0.18
+
+
+# Fetch the CPU processor for a complete display / view chain, optionally
+# overriding the looks applied, exactly as an application would.
+def view_processor(config, display, view, looks=None, source=None):
+    return processor_cache.get_CPU_processor(
+        config,
+        src=source or source_colourspace,
+        looks=looks,
+        display=display,
+        view=view
+    )
+
+
+# Hash every parameter that affects a bake. The config cache ID incorporates
+# the state of any files it references, so edited LUTs invalidate the bake.
+def bake_hash(config, display, view, looks, size, minimum_ev, maximum_ev):
+    parameters = {
+        "config": config.getCacheID(),
+        "display": display,
+        "view": view,
+        "looks": looks,
+        "size": size,
+        "minimum_ev": minimum_ev,
+        "maximum_ev": maximum_ev,
+        "od_middle_grey": LUT_od_middle_grey
+    }
+
+    return hashlib.sha256(
+        json.dumps(parameters, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+# Sample a display / view / look chain into a 3D LUT behind a normalised log2
+# shaper spanning minimum_ev to maximum_ev. Bakes are cached on disk under a
+# hash of all parameters, so repeated bakes cost a single file read. The
+# shaper clamps each channel before the chain's inset matrix sees it, so
+# widen the range when the footage exceeds the AgX exposure range.
+def bake_view_LUT(
+    config,
+    display,
+    view,
+    looks=None,
+    size=LUT_size,
+    minimum_ev=generate_config.AgX_min_EV,
+    maximum_ev=generate_config.AgX_max_EV,
+    cache_directory=cache_directory
+):
+    key = bake_hash(
+        config, display, view, looks, size, minimum_ev, maximum_ev
+    )
+
+    cache_file = None
+    if cache_directory is not None:
+        cache_file = pathlib.Path(cache_directory) / "{}.npz".format(key)
+        if cache_file.exists():
+            with numpy.load(cache_file) as cached:
+                return {name: cached[name] for name in cached.files}
+
+    shaper = numpy.linspace(0.0, 1.0, size)
+    lattice = numpy.stack(
+        numpy.meshgrid(shaper, shaper, shaper, indexing="ij"), axis=-1
+    )
+    table = numpy.ascontiguousarray(
+        AgX.normalized_log2_to_open_domain(
+            lattice,
+            LUT_od_middle_grey,
+            minimum_ev,
+            maximum_ev
+        ),
+        dtype=numpy.float32
+    )
+
+    view_processor(config, display, view, looks).applyRGB(table)
+
+    LUT = {
+        "table": table,
+        "minimum_ev": numpy.float64(minimum_ev),
+        "maximum_ev": numpy.float64(maximum_ev),
+        "od_middle_grey": numpy.float64(LUT_od_middle_grey)
+    }
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file = cache_file.with_suffix(".tmp.npz")
+        numpy.savez(temporary_file, **LUT)
+        temporary_file.replace(cache_file)
+
+    return LUT
+
+
+# Apply a baked LUT to open domain tristimulus. Pixels pass through the log2
+# shaper and are then interpolated, tetrahedrally or trilinearly, in chunks
+# spread across worker threads. Alpha, if present, is passed through.
+def apply_LUT3D(
+    RGB_input,
+    LUT,
+    method="tetrahedral",
+    out=None,
+    chunk_size=65536,
+    workers=None
+):
+    if method not in ("tetrahedral", "trilinear"):
+        raise ValueError("Unknown interpolation \"{}\".".format(method))
+
+    RGB_input = numpy.asarray(RGB_input)
+    dtype = AgX.resolve_dtype(RGB_input)
+    channels = RGB_input.shape[-1]
+
+    if out is None:
+        out = numpy.empty(RGB_input.shape, dtype=dtype)
+
+    table = LUT["table"]
+    size = table.shape[0]
+    table = table.reshape(-1, 3).astype(dtype, copy=False)
+    strides = numpy.array([size * size, size, 1])
+
+    in_pixels = RGB_input.reshape(-1, channels)
+    out_pixels = out.reshape(-1, channels)
+
+    def interpolate_chunks(starts):
+        for start in starts:
+            stop = start + chunk_size
+
+            position = AgX.open_domain_to_normalized_log2(
+                in_pixels[start:stop, :3],
+                LUT["od_middle_grey"],
+                LUT["minimum_ev"],
+                LUT["maximum_ev"],
+                dtype=dtype
+            ) * (size - 1)
+            position = numpy.nan_to_num(position, copy=False)
+            index = numpy.minimum(position.astype(numpy.intp), size - 2)
+            fraction = position - index
+            base = index @ strides
+
+            if method == "tetrahedral":
+                RGB = interpolate_tetrahedral(table, base, fraction, strides)
+            else:
+                RGB = interpolate_trilinear(table, base, fraction, strides)
+
+            out_pixels[start:stop, :3] = RGB
+
+    AgX.run_chunked(len(in_pixels), chunk_size, workers, interpolate_chunks)
+
+    if channels == 4:
+        out_pixels[:, 3] = in_pixels[:, 3]
+
+    return out
+
+
+# Walk from the base lattice corner to the opposite corner, stepping along
+# the axis with the largest fraction first. The four visited vertices form
+# the enclosing tetrahedron, weighted by the sorted fraction differences.
+def interpolate_tetrahedral(table, base, fraction, strides):
+    order = numpy.argsort(-fraction, axis=-1)
+    fraction = numpy.take_along_axis(fraction, order, axis=-1)
+    steps = strides[order]
+
+    vertex = base
+    RGB = (1.0 - fraction[:, 0, numpy.newaxis]) * table[vertex]
+    for axis in range(3):
+        vertex = vertex + steps[:, axis]
+        if axis < 2:
+            weight = fraction[:, axis] - fraction[:, axis + 1]
+        else:
+            weight = fraction[:, axis]
+        RGB += weight[:, numpy.newaxis] * table[vertex]
+
+    return RGB
+
+
+def interpolate_trilinear(table, base, fraction, strides):
+    RGB = numpy.zeros(fraction.shape, dtype=table.dtype)
+    for corner in numpy.ndindex(2, 2, 2):
+        weight = numpy.prod(
+            numpy.where(corner, fraction, 1.0 - fraction), axis=-1
+        )
+        RGB += weight[:, numpy.newaxis] * table[base + strides @ corner]
+
+    return RGB
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bake an AgX display / view chain into a 3D LUT."
+    )
+    parser.add_argument(
+        "--config",
+        default=str(
+            pathlib.Path(generate_config.output_config_directory)
+            / generate_config.output_config_name
+        )
+    )
+    parser.add_argument("--display", default="sRGB")
+    parser.add_argument("--view", default="AgX")
+    parser.add_argument("--looks", default=None)
+    parser.add_argument("--size", type=int, default=LUT_size)
+    parser.add_argument(
+        "--minimum-ev", type=float, default=generate_config.AgX_min_EV
+    )
+    parser.add_argument(
+        "--maximum-ev", type=float, default=generate_config.AgX_max_EV
+    )
+    parser.add_argument("--cache-directory", default=cache_directory)
+    args = parser.parse_args()
+
+    config = PyOpenColorIO.Config.CreateFromFile(args.config)
+    bake_view_LUT(
+        config,
+        args.display,
+        args.view,
+        looks=args.looks,
+        size=args.size,
+        minimum_ev=args.minimum_ev,
+        maximum_ev=args.maximum_ev,
+        cache_directory=args.cache_directory
+    )
+    print("Baked \"{}\" \"{}\" into \"{}\"".format(
+        args.display,
+        args.view,
+        pathlib.Path(args.cache_directory) / "{}.npz".format(
+            bake_hash(
+                config,
+                args.display,
+                args.view,
+                args.looks,
+                args.size,
+                args.minimum_ev,
+                args.maximum_ev
+            )
+        )
+    ))
@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy
+import AgX
+import generate_config
+
+####
+# Global Configuration Variables
+####
+benchmark_sizes = [10**exponent for exponent in range(3, 9)]
+benchmark_dtypes = ["float32", "float64"]
+benchmark_repeats = 3
+regression_threshold = 1.10
+
+# Half of physical memory, where the platform reports it.
+try:
+    benchmark_memory_limit = (
+        os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    )
+except (AttributeError, ValueError, OSError):
+    benchmark_memory_limit = 4 * 1024**3
+
+AgX_power = [3.0, 3.25]
+AgX_batch = 256
+image_width = 1024
+
+# Image files for the render_file case are written here, and removed when the
+# interpreter exits.
+scratch_directory = tempfile.TemporaryDirectory(prefix="AgX_benchmark_")
+
+
+def exposures(size, dtype):
+    return numpy.linspace(-12.0, 8.0, size, dtype=dtype)
+
+
+def open_domain(size, dtype):
+    return AgX.calculate_ev_to_od(exposures(size, dtype))
+
+
+def normalized(size, dtype):
+    return numpy.linspace(0.0, 1.0, size, dtype=dtype)
+
+
+def image(size, dtype):
+    return open_domain(size - size % 3, dtype).reshape(-1, 3)
+
+
+def curve_scale(size, dtype):
+    x = normalized(size, dtype)
+    return numpy.where(
+        x >= generate_config.AgX_x_pivot,
+        AgX.equation_scale(
+            1.0 - generate_config.AgX_x_pivot,
+            1.0 - generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power[1],
+            dtype=dtype
+        ),
+        -AgX.equation_scale(
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power[0],
+            dtype=dtype
+        )
+    ).astype(dtype)
+
+
+def curve(x):
+    return AgX.equation_full_curve_masked(
+        x,
+        generate_config.AgX_x_pivot,
+        generate_config.AgX_y_pivot,
+        generate_config.AgX_general_contrast,
+        generate_config.AgX_limits_contrast
+    )
+
+
+# Build a cubic curve LUT of size samples, bypassing the cache so that every
+# call pays for the build.
+def build_curve_LUT(size, dtype):
+    return AgX.cached_curve_LUT.__wrapped__(
+        generate_config.AgX_x_pivot,
+        generate_config.AgX_y_pivot,
+        2.0,
+        tuple(AgX_power),
+        "cubic",
+        size,
+        numpy.dtype(dtype).name,
+        7
+    )
+
+
+# Write an image of about size elements, image_width pixels wide, and return
+# it along with the path to render it to.
+def image_file(size, dtype):
+    pixels = image(size, dtype)
+    width = min(len(pixels), image_width)
+    pixels = pixels[:len(pixels) - len(pixels) % width]
+
+    directory = pathlib.Path(scratch_directory.name)
+    input_path = directory / "input_{}_{}.npy".format(size, dtype)
+    numpy.save(input_path, pixels.reshape(-1, width, 3))
+
+    return input_path, directory / "output_{}_{}.npy".format(size, dtype)
+
+
+def write_LUT(size):
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = generate_config.contrast_LUT_inputs(
+            generate_config.AgX_min_EV,
+            generate_config.AgX_max_EV,
+            generate_config.AgX_y_pivot,
+            generate_config.AgX_general_contrast,
+            generate_config.AgX_limits_contrast,
+            samples=size
+        )
+        generate_config.write_contrast_LUT(
+            pathlib.Path(directory) / "benchmark.spi1d", inputs
+        )
+
+
+# Each case maps a name to a function building the arguments for one call at
+# a given element count and dtype, the call itself, the number of pixels it
+# processes, and the fixed sizes to run at if it does not follow the sweep.
+benchmark_cases = {
+    "shape_OCIO_matrix": (
+        lambda size, dtype: (numpy.identity(3, dtype=dtype),),
+        AgX.shape_OCIO_matrix, lambda size: 1, [1]
+    ),
+    "AgX_compressed_matrix": (
+        lambda size, dtype: (), AgX.AgX_compressed_matrix,
+        lambda size: 1, [1]
+    ),
+    "AgX_compressed_matrices": (
+        lambda size, dtype: (numpy.linspace(0.0, 0.5, size),),
+        AgX.AgX_compressed_matrices, lambda size: size, [1000, 100000]
+    ),
+    "as_numeric": (
+        lambda size, dtype: (normalized(size, dtype), numpy.dtype(dtype).type),
+        AgX.as_numeric, lambda size: size, None
+    ),
+    "calculate_OCIO_log2": (
+        lambda size, dtype: (exposures(size, dtype),),
+        AgX.calculate_OCIO_log2, lambda size: size, None
+    ),
+    "calculate_ev_to_od": (
+        lambda size, dtype: (exposures(size, dtype),),
+        AgX.calculate_ev_to_od, lambda size: size, None
+    ),
+    "calculate_od_to_ev": (
+        lambda size, dtype: (open_domain(size, dtype),),
+        AgX.calculate_od_to_ev, lambda size: size, None
+    ),
+    "adjust_exposure": (
+        lambda size, dtype: (open_domain(size, dtype), 1.5),
+        AgX.adjust_exposure, lambda size: size, None
+    ),
+    "open_domain_to_normalized_log2": (
+        lambda size, dtype: (open_domain(size, dtype), 0.18, -10.0, 6.5),
+        AgX.open_domain_to_normalized_log2, lambda size: size, None
+    ),
+    "normalized_log2_to_open_domain": (
+        lambda size, dtype: (normalized(size, dtype), 0.18, -10.0, 6.5),
+        AgX.normalized_log2_to_open_domain, lambda size: size, None
+    ),
+    "equation_scale": (
+        lambda size, dtype: (
+            numpy.asarray(generate_config.AgX_x_pivot, dtype=dtype),
+            generate_config.AgX_y_pivot, 2.0, AgX_power[0]
+        ),
+        AgX.equation_scale, lambda size: 1, [1]
+    ),
+    "equation_hyperbolic": (
+        lambda size, dtype: (normalized(size, dtype), AgX_power[0]),
+        AgX.equation_hyperbolic, lambda size: size, None
+    ),
+    "equation_term": (
+        lambda size, dtype: (
+            normalized(size, dtype), generate_config.AgX_x_pivot, 2.0, 0.5
+        ),
+        AgX.equation_term, lambda size: size, None
+    ),
+    "equation_curve": (
+        lambda size, dtype: (
+            normalized(size, dtype),
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power,
+            curve_scale(size, dtype)
+        ),
+        AgX.equation_curve, lambda size: size, None
+    ),
+    "equation_full_curve": (
+        lambda size, dtype: (
+            normalized(size, dtype),
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power
+        ),
+        AgX.equation_full_curve, lambda size: size, None
+    ),
+    "equation_full_curve_masked": (
+        lambda size, dtype: (
+            normalized(size, dtype),
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power
+        ),
+        AgX.equation_full_curve_masked, lambda size: size, None
+    ),
+    "equation_full_curve_batched": (
+        lambda size, dtype: (
+            normalized(size, dtype),
+            numpy.full(AgX_batch, generate_config.AgX_x_pivot),
+            numpy.linspace(0.45, 0.55, AgX_batch),
+            numpy.linspace(1.8, 2.2, AgX_batch),
+            numpy.tile(AgX_power, (AgX_batch, 1))
+        ),
+        AgX.equation_full_curve_batched, lambda size: size * AgX_batch,
+        [4096]
+    ),
+    "equation_full_curve_slope": (
+        lambda size, dtype: (
+            normalized(size, dtype),
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power
+        ),
+        AgX.equation_full_curve_slope, lambda size: size, None
+    ),
+    "curve_LUT": (
+        lambda size, dtype: (size, dtype),
+        build_curve_LUT, lambda size: size, [4096, 65536]
+    ),
+    "LUT_sample_positions": (
+        lambda size, dtype: (curve, size, "curvature"),
+        AgX.LUT_sample_positions, lambda size: size, [4096]
+    ),
+    "adaptive_LUT_samples": (
+        lambda size, dtype: (curve, 2.0**-17),
+        AgX.adaptive_LUT_samples, lambda size: 1, [1]
+    ),
+    "apply_chunked": (
+        lambda size, dtype: (
+            AgX.equation_full_curve_masked,
+            normalized(size, dtype),
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power
+        ),
+        AgX.apply_chunked, lambda size: size, None
+    ),
+    "equation_full_curve_LUT": (
+        lambda size, dtype: (
+            normalized(size, dtype),
+            generate_config.AgX_x_pivot,
+            generate_config.AgX_y_pivot,
+            2.0,
+            AgX_power
+        ),
+        AgX.equation_full_curve_LUT, lambda size: size, None
+    ),
+    "render_image": (
+        lambda size, dtype: (image(size, dtype),),
+        AgX.render_image, lambda size: size // 3, None
+    ),
+    "render_file": (
+        image_file, AgX.render_file, lambda size: size // 3,
+        [10**6, 10**7]
+    ),
+    "generate_config.write_contrast_LUT": (
+        lambda size, dtype: (size,),
+        write_LUT, lambda size: size, [4096]
+    )
+}
+
+
+# Time a single case as the best of several calls, each with freshly built
+# arguments. Peak memory is measured on a separate traced call so tracing
+# never skews the timings.
+def run_case(name, size, dtype, repeats=benchmark_repeats):
+    build_arguments, function, pixels, _ = benchmark_cases[name]
+
+    seconds = []
+    for _ in range(repeats):
+        arguments = build_arguments(size, dtype)
+        start = time.perf_counter()
+        function(*arguments)
+        seconds.append(time.perf_counter() - start)
+        del arguments
+
+    arguments = build_arguments(size, dtype)
+    tracemalloc.start()
+    function(*arguments)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del arguments
+
+    best = min(seconds)
+
+    return {
+        "function": name,
+        "size": size,
+        "dtype": dtype,
+        "seconds": best,
+        "mpix_per_second": pixels(size) / best / 1.0e6 if best else None,
+        "peak_bytes": peak_bytes
+    }
+
+
+# Render black and deep shadows through every curve mode at a display
+# exponent other than the curve's own 2.2. The curve rounds to just below zero
+# at black, which the re-encoding power would otherwise turn into NaN, and a
+# benchmark of broken output measures nothing.
+def check_render_image(dtypes=benchmark_dtypes):
+    shadows = numpy.array(
+        [[0.0, 0.0, 0.0], [1.0e-6, 1.0e-6, 1.0e-6], [-1.0, 0.0, 1.0e-9]]
+    )
+
+    for dtype in dtypes:
+        for curve_mode in ("exact",) + AgX.curve_LUT_interpolations:
+            rendered = AgX.render_image(
+                shadows.astype(dtype),
+                display_exponent=2.4,
+                curve_mode=curve_mode
+            )
+            if not numpy.all(numpy.isfinite(rendered)):
+                raise ValueError(
+                    "Black renders as non finite values at {} with the "
+                    "\"{}\" curve mode.".format(dtype, curve_mode)
+                )
+
+
+def benchmark_metadata():
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=pathlib.Path(__file__).parent,
+            stderr=subprocess.DEVNULL
+        ).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version,
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor()
+    }
+
+
+def run_benchmarks(
+    names=None,
+    sizes=benchmark_sizes,
+    dtypes=benchmark_dtypes,
+    repeats=benchmark_repeats
+):
+    check_render_image(dtypes)
+
+    results = []
+    for name in names or benchmark_cases:
+        fixed_sizes = benchmark_cases[name][3]
+        for dtype in dtypes:
+            previous = None
+            for size in sorted(fixed_sizes or sizes):
+                # Extrapolate the peak memory linearly from the previous size
+                # and skip sizes that would not fit.
+                if previous is not None and (
+                    previous["peak_bytes"] * size / previous["size"]
+                    > benchmark_memory_limit
+                ):
+                    print("{:<36} {:>10} {:<8} skipped".format(
+                        name, size, dtype
+                    ))
+                    continue
+
+                result = run_case(name, size, dtype, repeats)
+                results.append(result)
+                previous = result
+                print(
+                    "{function:<36} {size:>10} {dtype:<8} "
+                    "{seconds:>10.6f}s {peak_bytes:>12}B".format(**result)
+                )
+
+    return {"metadata": benchmark_metadata(), "results": results}
+
+
+# Compare two result files case by case, reporting the time ratio of the
+# current run over the baseline, and list every case slower than threshold.
+def compare_results(baseline, current, threshold=regression_threshold):
+    def key(result):
+        return result["function"], result["size"], result["dtype"]
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+
+    regressions = []
+    for result in current["results"]:
+        reference = baseline_results.get(key(result))
+        if reference is None or not reference["seconds"]:
+            continue
+
+        ratio = result["seconds"] / reference["seconds"]
+        print("{:<36} {:>10} {:<8} {:>6.2f}x".format(*key(result), ratio))
+        if ratio > threshold:
+            regressions.append(key(result) + (ratio,))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the AgX numeric functions."
+    )
+    parser.add_argument(
+        "--functions", nargs="+", choices=sorted(benchmark_cases),
+        default=None
+    )
+    parser.add_argument(
+        "--sizes", type=float, nargs="+", default=benchmark_sizes
+    )
+    parser.add_argument(
+        "--dtypes", nargs="+", choices=benchmark_dtypes,
+        default=benchmark_dtypes
+    )
+    parser.add_argument("--repeats", type=int, default=benchmark_repeats)
+    parser.add_argument("--output", default=None)
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+        help="Compare two result files instead of running."
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=regression_threshold
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        with open(args.compare[1], "r") as current_file:
+            current = json.load(current_file)
+
+        regressions = compare_results(baseline, current, args.threshold)
+        for regression in regressions:
+            print("Regression {} {} {}: {:.2f}x".format(*regression))
+        sys.exit(1 if regressions else 0)
+
+    report = run_benchmarks(
+        args.functions,
+        [int(size) for size in args.sizes],
+        args.dtypes,
+        args.repeats
+    )
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print("Wrote results \"{}\"".format(args.output))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import numpy
+import PyOpenColorIO
+import AgX
+import processor_cache
+
+####
+# Global Configuration Variables
+####
+shader_cache_directory = "./cache/shaders/"
+shader_index_name = "shaders.json"
+shader_function_name = "OCIODisplay"
+source_colourspace = AgX.default_source_colourspace
+
+# Each language maps to the OCIO shading language and the file extension of
+# the exported shader text.
+shader_languages = {
+    "glsl": (PyOpenColorIO.GpuLanguage.GPU_LANGUAGE_GLSL_4_0, ".glsl"),
+    "hlsl": (PyOpenColorIO.GpuLanguage.GPU_LANGUAGE_HLSL_DX11, ".hlsl"),
+    "metal": (PyOpenColorIO.GpuLanguage.GPU_LANGUAGE_MSL_2_0, ".metal")
+}
+
+
+# Every display and view in the config, each also with every look applied as
+# an override when looks is set.
+def view_chains(config, looks=True):
+    look_names = [None]
+    if looks:
+        look_names += list(config.getLookNames())
+
+    return [
+        (display, view, look)
+        for display in config.getDisplays()
+        for view in config.getViews(display)
+        for look in look_names
+    ]
+
+
+# Hash the GPU processor's cache ID, which identifies every op and the
+# content of every LUT, together with what shapes the generated text.
+def shader_hash(processor, language, function_name=shader_function_name):
+    return hashlib.sha256(
+        "{}|{}|{}".format(
+            processor.getCacheID(), language, function_name
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+# Generate the shader text for a GPU processor along with the description and
+# values of every texture it samples. No GPU is needed.
+def extract_shader(processor, language, function_name=shader_function_name):
+    shader_desc = PyOpenColorIO.GpuShaderDesc.CreateShaderDesc(
+        language=shader_languages[language][0],
+        functionName=function_name
+    )
+    processor.extractGpuShaderInfo(shader_desc)
+
+    textures = [
+        {
+            "name": texture.textureName,
+            "sampler": texture.samplerName,
+            "width": texture.width,
+            "height": texture.height,
+            "channel": texture.channel.name,
+            "dimensions": texture.dimensions.name,
+            "interpolation": texture.interpolation.name,
+            "values": texture.getValues()
+        }
+        for texture in shader_desc.getTextures()
+    ]
+    textures_3D = [
+        {
+            "name": texture.textureName,
+            "sampler": texture.samplerName,
+            "edge_length": texture.edgeLen,
+            "interpolation": texture.interpolation.name,
+            "values": texture.getValues()
+        }
+        for texture in shader_desc.get3DTextures()
+    ]
+
+    return {
+        "text": shader_desc.getShaderText(),
+        "textures": textures,
+        "textures_3D": textures_3D,
+        "uniforms": [name for name, _ in shader_desc.getUniforms()]
+    }
+
+
+# Export a processor's shader into the cache directory under its hash, as the
+# shader text, one .npy file per texture, and a JSON description of the
+# textures. Identical transforms share one entry, and entries already on disk
+# are reused without generating anything.
+def export_shader(
+    processor,
+    language,
+    directory=shader_cache_directory,
+    function_name=shader_function_name
+):
+    key = shader_hash(processor, language, function_name)
+    entry_directory = pathlib.Path(directory) / key
+    metadata_file = entry_directory / "shader.json"
+
+    if metadata_file.exists():
+        return key, entry_directory
+
+    shader = extract_shader(processor, language, function_name)
+
+    temporary_directory = entry_directory.with_suffix(".tmp")
+    if temporary_directory.exists():
+        shutil.rmtree(temporary_directory)
+    temporary_directory.mkdir(parents=True)
+
+    shader_filename = "shader{}".format(shader_languages[language][1])
+    with open(temporary_directory / shader_filename, "w") as shader_file:
+        shader_file.write(shader["text"])
+
+    for texture in shader["textures"] + shader["textures_3D"]:
+        texture["file"] = "{}.npy".format(texture["name"])
+        numpy.save(
+            temporary_directory / texture["file"], texture.pop("values")
+        )
+
+    with open(temporary_directory / "shader.json", "w") as metadata:
+        json.dump(
+            {
+                "language": language,
+                "function": function_name,
+                "shader": shader_filename,
+                "textures": shader["textures"],
+                "textures_3D": shader["textures_3D"],
+                "uniforms": shader["uniforms"]
+            },
+            metadata,
+            indent=2
+        )
+
+    try:
+        os.replace(temporary_directory, entry_directory)
+    except OSError:
+        # Another export produced the same entry first.
+        shutil.rmtree(temporary_directory)
+
+    return key, entry_directory
+
+
+# Export shaders for every display / view / look chain of the config in each
+# language, and index them by chain so viewers can look up their shader at
+# startup.
+def export_shaders(
+    config,
+    directory=shader_cache_directory,
+    languages=tuple(shader_languages),
+    looks=True,
+    source=source_colourspace
+):
+    for language in languages:
+        if language not in shader_languages:
+            raise ValueError("Unknown shader language \"{}\".".format(
+                language
+            ))
+
+    directory = pathlib.Path(directory)
+    index = []
+    for display, view, look in view_chains(config, looks):
+        processor = processor_cache.get_GPU_processor(
+            config,
+            src=source,
+            looks=look,
+            display=display,
+            view=view
+        )
+        for language in languages:
+            key, _ = export_shader(processor, language, directory)
+            index.append({
+                "display": display,
+                "view": view,
+                "look": look,
+                "language": language,
+                "hash": key
+            })
+
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / shader_index_name, "w") as index_file:
+        json.dump(index, index_file, indent=2)
+
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export GPU shaders for every display / view / look."
+    )
+    parser.add_argument("--config", default=str(AgX.default_config_path))
+    parser.add_argument("--output-directory", default=shader_cache_directory)
+    parser.add_argument(
+        "--languages", nargs="+", choices=sorted(shader_languages),
+        default=sorted(shader_languages)
+    )
+    parser.add_argument(
+        "--no-looks", action="store_true",
+        help="Skip applying each look as an override to every view."
+    )
+    args = parser.parse_args()
+
+    index = export_shaders(
+        AgX.load_config(args.config),
+        args.output_directory,
+        args.languages,
+        looks=not args.no_looks
+    )
+    print("Exported {} shaders as {} unique entries into \"{}\"".format(
+        len(index),
+        len({entry["hash"] for entry in index}),
+        args.output_directory
+    ))
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import pathlib
+import numpy
+import AgX
+import generate_config
+
+####
+# Global Configuration Variables
+####
+fit_parameters = [
+    "x_pivot",
+    "y_pivot",
+    "slope_pivot",
+    "toe_power",
+    "shoulder_power"
+]
+fit_free_parameters = [
+    "y_pivot",
+    "slope_pivot",
+    "toe_power",
+    "shoulder_power"
+]
+fit_maximum_iterations = 100
+fit_tolerance = 1.0e-12
+
+
+# Partial derivatives of equation_scale with respect to each of its
+# arguments. The scale simplifies to (y^-p - (s * x)^-p)^(-1 / p) for pivot
+# x, y, slope s and power p.
+def equation_scale_partials(x_pivot, y_pivot, slope_pivot, power):
+    slope_x = slope_pivot * x_pivot
+    inner = y_pivot**-power - slope_x**-power
+    scale = inner**(-1.0 / power)
+    outer = inner**(-1.0 / power - 1.0)
+
+    return {
+        "x_pivot": -outer * slope_pivot * slope_x**(-power - 1.0),
+        "y_pivot": outer * y_pivot**(-power - 1.0),
+        "slope_pivot": -outer * x_pivot * slope_x**(-power - 1.0),
+        "power": scale * (
+            numpy.log(inner) / power**2
+            - (
+                -numpy.log(y_pivot) * y_pivot**-power
+                + numpy.log(slope_x) * slope_x**-power
+            ) / (power * inner)
+        )
+    }
+
+
+# Partial derivatives of equation_hyperbolic with respect to x and power. The
+# power derivative tends to zero at x = 0, where x^p log(x) is undefined.
+def equation_hyperbolic_partials(x, power):
+    x_power = x**power
+    base = 1.0 + x_power
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        x_log = numpy.where(x > 0.0, x_power * numpy.log(x), 0.0)
+
+    return {
+        "x": base**(-1.0 / power - 1.0),
+        "power": x * base**(-1.0 / power) * (
+            numpy.log(base) / power**2 - x_log / (power * base)
+        )
+    }
+
+
+def equation_term_partials(x, x_pivot, slope_pivot, scale):
+    return {
+        "x_pivot": -slope_pivot / scale,
+        "slope_pivot": (x - x_pivot) / scale,
+        "scale": -(slope_pivot * (x - x_pivot)) / scale**2
+    }
+
+
+# The curve and its Jacobian with respect to fit_parameters, shaped (N, 5),
+# from the chain rule through the scale, term and hyperbolic partials. As in
+# equation_full_curve_batched, the toe or shoulder constants are selected per
+# element so each quantity is evaluated once.
+def curve_jacobian(
+    x,
+    x_pivot,
+    y_pivot,
+    slope_pivot,
+    toe_power,
+    shoulder_power
+):
+    x = numpy.asarray(x, dtype=numpy.float64)
+
+    toe = equation_scale_partials(x_pivot, y_pivot, slope_pivot, toe_power)
+    shoulder = equation_scale_partials(
+        1.0 - x_pivot, 1.0 - y_pivot, slope_pivot, shoulder_power
+    )
+    toe_scale = -AgX.equation_scale(x_pivot, y_pivot, slope_pivot, toe_power)
+    shoulder_scale = AgX.equation_scale(
+        1.0 - x_pivot, 1.0 - y_pivot, slope_pivot, shoulder_power
+    )
+
+    is_shoulder = x >= x_pivot
+    is_toe = ~is_shoulder
+
+    scale = numpy.where(is_shoulder, shoulder_scale, toe_scale)
+    power = numpy.where(is_shoulder, shoulder_power, toe_power)
+
+    # Derivatives of the signed scale with respect to each fit parameter. The
+    # toe scale is negated, and the shoulder mirrors both pivots.
+    scale_partials = numpy.stack([
+        numpy.where(is_shoulder, -shoulder["x_pivot"], -toe["x_pivot"]),
+        numpy.where(is_shoulder, -shoulder["y_pivot"], -toe["y_pivot"]),
+        numpy.where(
+            is_shoulder, shoulder["slope_pivot"], -toe["slope_pivot"]
+        ),
+        numpy.where(is_toe, -toe["power"], 0.0),
+        numpy.where(is_shoulder, shoulder["power"], 0.0)
+    ], axis=-1)
+    power_partials = numpy.stack([
+        numpy.zeros(x.shape),
+        numpy.zeros(x.shape),
+        numpy.zeros(x.shape),
+        is_toe.astype(numpy.float64),
+        is_shoulder.astype(numpy.float64)
+    ], axis=-1)
+
+    term = AgX.equation_term(x, x_pivot, slope_pivot, scale)
+    term_partials = equation_term_partials(x, x_pivot, slope_pivot, scale)
+    term_direct = numpy.stack([
+        term_partials["x_pivot"],
+        numpy.zeros(x.shape),
+        term_partials["slope_pivot"],
+        numpy.zeros(x.shape),
+        numpy.zeros(x.shape)
+    ], axis=-1)
+    term_jacobian = (
+        term_direct
+        + term_partials["scale"][..., numpy.newaxis] * scale_partials
+    )
+
+    hyperbolic = AgX.equation_hyperbolic(term, power)
+    hyperbolic_partials = equation_hyperbolic_partials(term, power)
+
+    curve = scale * hyperbolic + y_pivot
+    jacobian = (
+        scale_partials * hyperbolic[..., numpy.newaxis]
+        + scale[..., numpy.newaxis] * (
+            hyperbolic_partials["x"][..., numpy.newaxis] * term_jacobian
+            + hyperbolic_partials["power"][..., numpy.newaxis]
+            * power_partials
+        )
+    )
+    jacobian[..., 1] += 1.0
+
+    return curve, jacobian
+
+
+# Fit the sigmoid to target samples over [0, 1] by Levenberg-Marquardt on the
+# analytic Jacobian. Parameters not listed in free hold their initial values.
+# Steps leaving the curve undefined are rejected like any other uphill step.
+def fit_curve(
+    x,
+    target,
+    initial=None,
+    free=fit_free_parameters,
+    maximum_iterations=fit_maximum_iterations,
+    tolerance=fit_tolerance
+):
+    x = numpy.asarray(x, dtype=numpy.float64)
+    target = numpy.asarray(target, dtype=numpy.float64)
+
+    if initial is None:
+        initial = {
+            "x_pivot": generate_config.AgX_x_pivot,
+            "y_pivot": generate_config.AgX_y_pivot,
+            "slope_pivot": generate_config.AgX_general_contrast,
+            "toe_power": generate_config.AgX_limits_contrast[0],
+            "shoulder_power": generate_config.AgX_limits_contrast[1]
+        }
+    for name in free:
+        if name not in fit_parameters:
+            raise ValueError("Unknown fit parameter \"{}\".".format(name))
+
+    columns = [fit_parameters.index(name) for name in free]
+    parameters = numpy.array(
+        [float(initial[name]) for name in fit_parameters]
+    )
+
+    def evaluate(parameters):
+        with numpy.errstate(all="ignore"):
+            curve, jacobian = curve_jacobian(x, *parameters)
+        residual = curve - target
+        cost = residual @ residual
+        if not numpy.isfinite(cost):
+            cost = numpy.inf
+
+        return cost, residual, jacobian[:, columns]
+
+    cost, residual, jacobian = evaluate(parameters)
+    if not numpy.isfinite(cost):
+        raise ValueError("The initial parameters do not define a curve.")
+
+    damping = 1.0e-3
+    iteration = 0
+    for iteration in range(1, maximum_iterations + 1):
+        normal = jacobian.T @ jacobian
+        gradient = jacobian.T @ residual
+
+        step = numpy.linalg.solve(
+            normal + damping * numpy.diag(numpy.diag(normal) + 1.0e-12),
+            -gradient
+        )
+        candidate = parameters.copy()
+        candidate[columns] += step
+        candidate_cost, candidate_residual, candidate_jacobian = evaluate(
+            candidate
+        )
+
+        if candidate_cost < cost:
+            converged = cost - candidate_cost <= tolerance * max(cost, 1.0)
+            parameters = candidate
+            cost, residual, jacobian = (
+                candidate_cost, candidate_residual, candidate_jacobian
+            )
+            damping = max(damping / 10.0, 1.0e-12)
+            if converged:
+                break
+        else:
+            damping *= 10.0
+            if damping > 1.0e12:
+                break
+
+    fitted = dict(zip(fit_parameters, parameters.tolist()))
+    fitted.update({
+        "rms_error": float(numpy.sqrt(cost / len(x))),
+        "maximum_error": float(numpy.max(numpy.abs(residual))),
+        "iterations": iteration
+    })
+
+    return fitted
+
+
+# Read target samples, either a NumPy array of values uniformly spaced over
+# [0, 1] or any 1D LUT colour can read, averaging the channels of a 3x1D LUT.
+def read_target(path):
+    path = pathlib.Path(path)
+
+    if path.suffix == ".npy":
+        target = numpy.load(path)
+    else:
+        import colour
+
+        target = numpy.asarray(colour.read_LUT(str(path)).table)
+        if target.ndim > 1:
+            target = target.mean(axis=-1)
+
+    return numpy.linspace(0.0, 1.0, len(target)), target
+
+
+# The contrast LUT inputs for a fitted curve, so it is written exactly as
+# generate_config writes the default. The x pivot follows from the EV range.
+def fitted_LUT_inputs(fitted, minimum_ev, maximum_ev):
+    return generate_config.contrast_LUT_inputs(
+        minimum_ev,
+        maximum_ev,
+        fitted["y_pivot"],
+        fitted["slope_pivot"],
+        [fitted["toe_power"], fitted["shoulder_power"]]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fit the AgX sigmoid to a target tone curve."
+    )
+    parser.add_argument("target")
+    parser.add_argument(
+        "--minimum-ev", type=float, default=generate_config.AgX_min_EV
+    )
+    parser.add_argument(
+        "--maximum-ev", type=float, default=generate_config.AgX_max_EV
+    )
+    parser.add_argument("--output", default="AgX_Fitted_Contrast.spi1d")
+    parser.add_argument(
+        "--config-directory", default=None,
+        help="Also generate a complete config using the fitted curve."
+    )
+    args = parser.parse_args()
+
+    x, target = read_target(args.target)
+    initial = {
+        "x_pivot": numpy.abs(
+            args.minimum_ev / (args.maximum_ev - args.minimum_ev)
+        ),
+        "y_pivot": generate_config.AgX_y_pivot,
+        "slope_pivot": generate_config.AgX_general_contrast,
+        "toe_power": generate_config.AgX_limits_contrast[0],
+        "shoulder_power": generate_config.AgX_limits_contrast[1]
+    }
+    fitted = fit_curve(x, target, initial)
+    print(
+        "Fitted y_pivot {y_pivot:.6f} slope_pivot {slope_pivot:.6f} "
+        "power [{toe_power:.6f}, {shoulder_power:.6f}] "
+        "with RMS error {rms_error:.3g} in {iterations} iterations".format(
+            **fitted
+        )
+    )
+
+    generate_config.write_contrast_LUT(
+        args.output,
+        fitted_LUT_inputs(fitted, args.minimum_ev, args.maximum_ev)
+    )
+    print("Wrote LUT \"{}\"".format(args.output))
+
+    if args.config_directory is not None:
+        generate_config.build_config(
+            output_directory=args.config_directory,
+            minimum_ev=args.minimum_ev,
+            maximum_ev=args.maximum_ev,
+            y_pivot=fitted["y_pivot"],
+            general_contrast=fitted["slope_pivot"],
+            limits_contrast=[fitted["toe_power"], fitted["shoulder_power"]]
+        )
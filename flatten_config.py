@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import copy
+import json
+import time
+import numpy
+import PyOpenColorIO
+import AgX
+
+####
+# Global Configuration Variables
+####
+benchmark_pixels = 1 << 20
+benchmark_repeats = 5
+source_colourspace = AgX.default_source_colourspace
+
+FORWARD = PyOpenColorIO.TransformDirection.TRANSFORM_DIR_FORWARD
+INVERSE = PyOpenColorIO.TransformDirection.TRANSFORM_DIR_INVERSE
+TO_REFERENCE = PyOpenColorIO.ColorSpaceDirection.COLORSPACE_DIR_TO_REFERENCE
+FROM_REFERENCE = (
+    PyOpenColorIO.ColorSpaceDirection.COLORSPACE_DIR_FROM_REFERENCE
+)
+TransformType = PyOpenColorIO.TransformType
+
+
+def invert_transforms(transforms):
+    inverted = []
+    for transform in reversed(transforms):
+        transform = copy.deepcopy(transform)
+        transform.setDirection(
+            FORWARD if transform.getDirection() == INVERSE else INVERSE
+        )
+        inverted.append(transform)
+
+    return inverted
+
+
+# The transforms taking a colourspace to or from the reference space, falling
+# back to the inverse of the opposite direction where only that is defined.
+def reference_transforms(config, colourspace, to_reference):
+    forward, backward = (
+        (TO_REFERENCE, FROM_REFERENCE) if to_reference
+        else (FROM_REFERENCE, TO_REFERENCE)
+    )
+
+    transform = colourspace.getTransform(forward)
+    if transform is not None:
+        return resolve_transform(config, transform)
+
+    transform = colourspace.getTransform(backward)
+    if transform is not None:
+        return invert_transforms(resolve_transform(config, transform))
+
+    return []
+
+
+# Resolve a conversion between two colourspaces into primitive transforms. A
+# named transform as the source applies its forward transform, and as the
+# destination its inverse, exactly as OCIO evaluates them.
+def resolve_colourspace_conversion(config, src, dst):
+    for name, inverse in ((src, False), (dst, True)):
+        named_transform = config.getNamedTransform(name)
+        if named_transform is None:
+            continue
+
+        transform = named_transform.getTransform(FORWARD)
+        transforms = (
+            resolve_transform(config, transform) if transform is not None
+            else invert_transforms(resolve_transform(
+                config, named_transform.getTransform(INVERSE)
+            ))
+        )
+
+        return invert_transforms(transforms) if inverse else transforms
+
+    src_colourspace = config.getColorSpace(src)
+    dst_colourspace = config.getColorSpace(dst)
+    for name, colourspace in ((src, src_colourspace), (dst, dst_colourspace)):
+        if colourspace is None:
+            raise ValueError("Unknown colourspace \"{}\".".format(name))
+
+    if (
+        src_colourspace.getName() == dst_colourspace.getName()
+        or src_colourspace.isData()
+        or dst_colourspace.isData()
+    ):
+        return []
+
+    if (
+        src_colourspace.getReferenceSpaceType()
+        != dst_colourspace.getReferenceSpaceType()
+    ):
+        raise ValueError(
+            "Cannot flatten \"{}\" to \"{}\" across reference spaces.".format(
+                src, dst
+            )
+        )
+
+    return (
+        reference_transforms(config, src_colourspace, True)
+        + reference_transforms(config, dst_colourspace, False)
+    )
+
+
+# Resolve a look transform, applying each look in its process space and
+# converting from the source, between process spaces, and to the destination.
+def resolve_look(config, transform):
+    transforms = []
+    current = transform.getSrc()
+
+    for token in transform.getLooks().replace(":", ",").split(","):
+        token = token.strip()
+        if not token:
+            continue
+
+        inverse = token.startswith("-")
+        look = config.getLook(token.lstrip("+-"))
+        if look is None:
+            raise ValueError("Unknown look \"{}\".".format(token))
+
+        if not transform.getSkipColorSpaceConversion():
+            transforms += resolve_colourspace_conversion(
+                config, current, look.getProcessSpace()
+            )
+            current = look.getProcessSpace()
+
+        if inverse and look.getInverseTransform() is not None:
+            transforms += resolve_transform(config, look.getInverseTransform())
+        elif inverse:
+            transforms += invert_transforms(
+                resolve_transform(config, look.getTransform())
+            )
+        elif look.getTransform() is not None:
+            transforms += resolve_transform(config, look.getTransform())
+        else:
+            transforms += invert_transforms(
+                resolve_transform(config, look.getInverseTransform())
+            )
+
+    if not transform.getSkipColorSpaceConversion():
+        transforms += resolve_colourspace_conversion(
+            config, current, transform.getDst()
+        )
+
+    return transforms
+
+
+# Expand a transform into a flat list of primitive transforms, resolving
+# groups, colourspace references, named transforms and looks recursively.
+def resolve_transform(config, transform):
+    transform_type = transform.getTransformType()
+
+    if transform_type == TransformType.TRANSFORM_TYPE_GROUP:
+        transforms = []
+        for child in transform:
+            transforms += resolve_transform(config, child)
+    elif transform_type == TransformType.TRANSFORM_TYPE_COLORSPACE:
+        transforms = resolve_colourspace_conversion(
+            config, transform.getSrc(), transform.getDst()
+        )
+    elif transform_type == TransformType.TRANSFORM_TYPE_LOOK:
+        transforms = resolve_look(config, transform)
+    else:
+        return [copy.deepcopy(transform)]
+
+    if transform.getDirection() == INVERSE:
+        return invert_transforms(transforms)
+
+    return transforms
+
+
+# A matrix transform as a 4x4 matrix and offset in the forward direction.
+def matrix_affine(transform):
+    matrix = numpy.reshape(transform.getMatrix(), (4, 4))
+    offset = numpy.asarray(transform.getOffset(), dtype=numpy.float64)
+
+    if transform.getDirection() == INVERSE:
+        matrix = numpy.linalg.inv(matrix)
+        offset = -matrix @ offset
+
+    return matrix, offset
+
+
+# Per channel powers of an exponent transform that clamps negatives, or None
+# for any other negative style, which would not compose.
+def exponent_powers(transform):
+    if (
+        transform.getNegativeStyle()
+        != PyOpenColorIO.NegativeStyle.NEGATIVE_CLAMP
+    ):
+        return None
+
+    powers = numpy.asarray(transform.getValue(), dtype=numpy.float64)
+
+    return 1.0 / powers if transform.getDirection() == INVERSE else powers
+
+
+def is_clamp_to_zero(transform):
+    return (
+        transform.getTransformType() == TransformType.TRANSFORM_TYPE_RANGE
+        and transform.getDirection() == FORWARD
+        and transform.hasMinInValue()
+        and transform.hasMinOutValue()
+        and transform.getMinInValue() == 0.0
+        and transform.getMinOutValue() == 0.0
+        and not transform.hasMaxInValue()
+        and not transform.hasMaxOutValue()
+    )
+
+
+# Fold one adjacent pair of transforms into a list of zero or more, or return
+# None when the pair does not simplify. Matrices compose into one. Clamping
+# exponents compose into one, and pairs that cancel become a range clamping
+# negatives to zero, which is all that remains of their effect. Repeated
+# clamps collapse into one.
+def fold_pair(first, second):
+    first_type = first.getTransformType()
+    second_type = second.getTransformType()
+
+    if (
+        first_type == TransformType.TRANSFORM_TYPE_MATRIX
+        and second_type == TransformType.TRANSFORM_TYPE_MATRIX
+    ):
+        first_matrix, first_offset = matrix_affine(first)
+        second_matrix, second_offset = matrix_affine(second)
+        matrix = second_matrix @ first_matrix
+        offset = second_matrix @ first_offset + second_offset
+
+        if (
+            numpy.allclose(matrix, numpy.identity(4), rtol=0.0, atol=1.0e-12)
+            and numpy.allclose(offset, 0.0, rtol=0.0, atol=1.0e-12)
+        ):
+            return []
+
+        return [PyOpenColorIO.MatrixTransform(
+            matrix=matrix.reshape(-1).tolist(),
+            offset=offset.tolist()
+        )]
+
+    if (
+        first_type == TransformType.TRANSFORM_TYPE_EXPONENT
+        and second_type == TransformType.TRANSFORM_TYPE_EXPONENT
+    ):
+        first_powers = exponent_powers(first)
+        second_powers = exponent_powers(second)
+        if first_powers is None or second_powers is None:
+            return None
+
+        powers = first_powers * second_powers
+        if numpy.allclose(powers, 1.0, rtol=0.0, atol=1.0e-12):
+            return [PyOpenColorIO.RangeTransform(
+                minInValue=0.0,
+                minOutValue=0.0
+            )]
+
+        return [PyOpenColorIO.ExponentTransform(value=powers.tolist())]
+
+    if is_clamp_to_zero(first) and is_clamp_to_zero(second):
+        return [first]
+
+    return None
+
+
+# Fold adjacent pairs repeatedly until nothing further simplifies, as each
+# fold can bring new neighbours together.
+def fold_transforms(transforms):
+    transforms = list(transforms)
+
+    folded = True
+    while folded:
+        folded = False
+        for index in range(len(transforms) - 1):
+            replacement = fold_pair(transforms[index], transforms[index + 1])
+            if replacement is not None:
+                transforms[index:index + 2] = replacement
+                folded = True
+                break
+
+    return transforms
+
+
+def flatten_transform(config, transform):
+    transforms = fold_transforms(resolve_transform(config, transform))
+
+    return PyOpenColorIO.GroupTransform(transforms)
+
+
+# Every colourspace used by a display / view.
+def view_colourspaces(config):
+    names = []
+    for display in config.getDisplays():
+        for view in config.getViews(display):
+            name = config.getDisplayViewColorSpaceName(display, view)
+            if name not in names:
+                names.append(name)
+
+    return names
+
+
+# Return a copy of the config with the colourspace of every view replaced by
+# a single flat group of primitive transforms from the reference space. All
+# views are resolved against the original config before any is replaced.
+def flatten_views(config):
+    flattened = {}
+    for name in view_colourspaces(config):
+        colourspace = config.getColorSpace(name)
+        if colourspace.isData():
+            continue
+
+        flattened[name] = flatten_transform(
+            config,
+            PyOpenColorIO.ColorSpaceTransform(
+                src=config.getCanonicalName("reference"),
+                dst=name
+            )
+        )
+
+    flat_config = copy.deepcopy(config)
+    for name, transform in flattened.items():
+        colourspace = copy.deepcopy(config.getColorSpace(name))
+        colourspace.setTransform(transform, FROM_REFERENCE)
+        colourspace.setTransform(None, TO_REFERENCE)
+        flat_config.addColorSpace(colourspace)
+
+    return flat_config
+
+
+def view_processor(config, display, view, source=source_colourspace):
+    return config.getProcessor(
+        source, display, view, FORWARD
+    ).getDefaultCPUProcessor()
+
+
+# Time building the CPU processor of every display / view, with OCIO's
+# processor cache off, and applying it to a float32 image, for the original
+# and the flattened config. Also reports the number of transforms each view
+# resolves to and the largest difference between the two outputs.
+def benchmark_views(
+    config,
+    flat_config,
+    pixels=benchmark_pixels,
+    repeats=benchmark_repeats,
+    source=source_colourspace
+):
+    image = numpy.random.default_rng(0).uniform(
+        0.0, 16.0, (pixels, 3)
+    ).astype(numpy.float32)
+
+    configs = {"before": config, "after": flat_config}
+    for benchmarked in configs.values():
+        benchmarked.setProcessorCacheFlags(
+            PyOpenColorIO.ProcessorCacheFlags.PROCESSOR_CACHE_OFF
+        )
+
+    results = []
+    for display in config.getDisplays():
+        for view in config.getViews(display):
+            result = {"display": display, "view": view}
+            processors = {}
+            timings = {label: {"build": [], "apply": []} for label in configs}
+
+            # Alternate between the configs so that neither is favoured by
+            # warm caches or clock changes.
+            for _ in range(repeats):
+                for label, benchmarked in configs.items():
+                    start = time.perf_counter()
+                    processors[label] = view_processor(
+                        benchmarked, display, view, source
+                    )
+                    timings[label]["build"].append(
+                        time.perf_counter() - start
+                    )
+
+            outputs = {}
+            for _ in range(repeats):
+                for label in configs:
+                    outputs[label] = image.copy()
+                    start = time.perf_counter()
+                    processors[label].applyRGB(outputs[label])
+                    timings[label]["apply"].append(
+                        time.perf_counter() - start
+                    )
+
+            for label, benchmarked in configs.items():
+                result[label] = {
+                    "transforms": len(benchmarked.getProcessor(
+                        source, display, view, FORWARD
+                    ).createGroupTransform()),
+                    "build_seconds": min(timings[label]["build"]),
+                    "nanoseconds_per_pixel": (
+                        min(timings[label]["apply"]) / pixels * 1.0e9
+                    )
+                }
+
+            result["maximum_difference"] = float(numpy.max(numpy.abs(
+                outputs["after"] - outputs["before"]
+            )))
+            results.append(result)
+            print(
+                "{:<12} {:<20} transforms {:>3} -> {:<3} "
+                "build {:>7.1f}us -> {:>7.1f}us "
+                "{:>6.2f}ns -> {:>6.2f}ns per pixel, "
+                "difference {:.3g}".format(
+                    display,
+                    view,
+                    result["before"]["transforms"],
+                    result["after"]["transforms"],
+                    result["before"]["build_seconds"] * 1.0e6,
+                    result["after"]["build_seconds"] * 1.0e6,
+                    result["before"]["nanoseconds_per_pixel"],
+                    result["after"]["nanoseconds_per_pixel"],
+                    result["maximum_difference"]
+                )
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Flatten the view transforms of a config and benchmark "
+        "them before and after."
+    )
+    parser.add_argument("--config", default=str(AgX.default_config_path))
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--pixels", type=int, default=benchmark_pixels)
+    parser.add_argument("--repeats", type=int, default=benchmark_repeats)
+    parser.add_argument("--report", default=None)
+    args = parser.parse_args()
+
+    config = AgX.load_config(args.config)
+    flat_config = flatten_views(config)
+
+    results = benchmark_views(config, flat_config, args.pixels, args.repeats)
+    if args.report is not None:
+        with open(args.report, "w") as report_file:
+            json.dump(results, report_file, indent=2)
+
+    if args.output is not None:
+        flat_config.setWorkingDir(config.getWorkingDir())
+        with open(args.output, "w") as output_file:
+            output_file.write(flat_config.serialize())
+        print("Wrote config \"{}\"".format(args.output))
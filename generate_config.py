@@ -1,36 +1,81 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import time
+
+# Imports are timed for the build report, as colour dominates start up.
+import_start = time.perf_counter()
+
+import argparse
 import PyOpenColorIO
 import numpy
 import colour
+import hashlib
+import json
+import os
 import pathlib
+import shutil
 import AgX
+import flatten_config
+import instrumentation
+
+import_stop = time.perf_counter()
 
 ####
 # Global Configuration Variables
 ####
 output_config_directory = "./config/"
 output_config_name = "config.ocio"
+
+# Optionally also package the config and its LUTs into a single OCIO archive,
+# loadable directly by OCIO 2.2 and later, so hosts open one file rather than
+# resolving the search path for every LUT.
+output_config_archive = False
+output_archive_name = "config.ocioz"
+
+# Optionally replace the colourspace of every view with a single flat group of
+# primitive transforms, folded where adjacent transforms compose, so hosts
+# build each view processor from fewer transforms.
+output_config_flatten = False
 output_LUTs_directory = "./LUTs/"
 LUT_search_paths = ["LUTs"]
 
+# The display / view / look matrix. Each display names its display
+# colourspace, and the pair of colourspaces re-encoding the 2.2 exponent AgX
+# Base image for it, or None where it is already encoded for the display.
+# Every display receives a "Display Native" and an "AgX" view, and an
+# "Appearance" view for every look. The encodings and looks are defined once
+# as shared named transforms, so each further display or look adds a single
+# definition plus one small view colourspace per display.
 supported_displays = {
-    "Display P3": {
-        "Display Native": "Display P3 Display",
-        "AgX": "AgX Display P3 Display"
-    },
     "sRGB": {
-        "Display Native": "sRGB Display",
-        "AgX": "AgX sRGB Display"
+        "colourspace": "sRGB",
+        "encoding": None
+    },
+    "Display P3": {
+        "colourspace": "Display P3",
+        "encoding": ["2.2 EOTF Encoding", "Display P3"]
     },
     "BT.1886": {
-        "Display Native": "Display P3 Display",
-        "AgX": "AgX BT.1886 Display"
+        "colourspace": "BT.1886",
+        "encoding": ["2.2 EOTF Encoding", "2.4 EOTF Encoding"]
+    }
+}
+
+supported_looks = {
+    # Golden Kraken
+    "Golden": {
+        "description": "A golden tinted, slightly washed look",
+        "slope": [1.0, 0.9, 0.5],
+        "power": [0.8, 0.8, 0.8],
+        "sat": 1.3
     },
-    "HDR 1000": {
-        "Display Native": "Display P3 Display",
-        "AgX": "AgX HDR 1000 Display"
+    # Punchy Kraken
+    "Punchy": {
+        "description": "A punchy and more chroma laden look",
+        "slope": [1.0, 1.0, 1.0],
+        "power": [1.35, 1.35, 1.35],
+        "sat": 1.4
     }
 }
 
@@ -38,8 +83,192 @@ AgX_min_EV = -10.0
 AgX_max_EV = +6.5
 AgX_x_pivot = numpy.abs(AgX_min_EV / (AgX_max_EV - AgX_min_EV))
 AgX_y_pivot = 0.50
+AgX_general_contrast = 2.0
+AgX_limits_contrast = [3.0, 3.25]
+AgX_compression = 0.20
 
-if __name__ == "__main__":
+# The contrast LUT ships at a fixed 4096 samples. Set AgX_LUT_samples to None
+# to size it instead to the fewest samples that, linearly interpolated, stay
+# within AgX_LUT_maximum_error of the curve. That bounds the curve alone, and
+# the view output after the LUT can shift by more, so the bound should be
+# tightened to suit before relying on it.
+AgX_LUT_samples = 4096
+AgX_LUT_maximum_error = 2.0**-17
+
+# Skip regenerating and rewriting artefacts whose inputs are unchanged, so
+# that a no-op rebuild leaves file modification times alone.
+incremental_build = True
+build_manifest_name = ".build_manifest.json"
+
+
+def hash_inputs(inputs):
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, default=repr).encode("utf-8")
+    ).hexdigest()
+
+
+def hash_file(path):
+    try:
+        with open(path, "rb") as hashed_file:
+            return hashlib.sha256(hashed_file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def load_build_manifest(directory):
+    try:
+        with open(pathlib.Path(directory) / build_manifest_name, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_build_manifest(directory, manifest):
+    if load_build_manifest(directory) == manifest:
+        return
+
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / build_manifest_name, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+# An artefact is current when it was built from identical inputs and has not
+# been modified on disk since.
+def artefact_is_current(manifest, path, inputs):
+    record = manifest.get(str(path))
+
+    return (
+        incremental_build
+        and record is not None
+        and record["inputs"] == hash_inputs(inputs)
+        and record["output"] == hash_file(path)
+    )
+
+
+def record_artefact(manifest, path, inputs):
+    manifest[str(path)] = {
+        "inputs": hash_inputs(inputs),
+        "output": hash_file(path)
+    }
+
+
+def link_file(source, destination):
+    destination = pathlib.Path(destination)
+    if destination.exists():
+        destination.unlink()
+
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def contrast_LUT_inputs(
+    minimum_ev,
+    maximum_ev,
+    y_pivot,
+    general_contrast,
+    limits_contrast,
+    samples=AgX_LUT_samples,
+    maximum_error=AgX_LUT_maximum_error
+):
+    x_pivot = numpy.abs(minimum_ev / (maximum_ev - minimum_ev))
+
+    if samples is None:
+        with instrumentation.span("LUT sizing"):
+            samples = AgX.adaptive_LUT_samples(
+                lambda x: AgX.equation_full_curve_masked(
+                    x, x_pivot, y_pivot, general_contrast, limits_contrast
+                ),
+                maximum_error
+            )
+
+    return {
+        "name": "AgX Default Contrast",
+        "samples": samples,
+        "minimum_ev": minimum_ev,
+        "maximum_ev": maximum_ev,
+        "x_pivot": x_pivot,
+        "y_pivot": y_pivot,
+        "general_contrast": general_contrast,
+        "limits_contrast": list(limits_contrast),
+        "method": "Sony SPI1D"
+    }
+
+
+def write_contrast_LUT(LUT_filename, inputs):
+    with instrumentation.span("LUT evaluation", samples=inputs["samples"]):
+        x_input = numpy.linspace(0.0, 1.0, inputs["samples"])
+        y_LUT = AgX.equation_full_curve_masked(
+            x_input,
+            inputs["x_pivot"],
+            inputs["y_pivot"],
+            inputs["general_contrast"],
+            inputs["limits_contrast"]
+        )
+
+    aesthetic_LUT = colour.LUT1D(
+        table=y_LUT,
+        name=inputs["name"]
+    )
+
+    # Never write through a link to a LUT shared with other configs.
+    LUT_filename = pathlib.Path(LUT_filename)
+    LUT_filename.parent.mkdir(parents=True, exist_ok=True)
+    if LUT_filename.exists():
+        LUT_filename.unlink()
+    with instrumentation.span("write_LUT", filename=LUT_filename.name):
+        colour.io.luts.write_LUT(
+            aesthetic_LUT, LUT_filename, method=inputs["method"]
+        )
+
+    return LUT_filename
+
+
+# Archive the config together with the LUTs it references. The LUTs are
+# resolved against output_directory, where they have already been written.
+def write_config_archive(config, output_directory, build_manifest, inputs):
+    archive_file = pathlib.Path(output_directory) / output_archive_name
+
+    if artefact_is_current(build_manifest, archive_file, inputs):
+        print("Skipped unchanged archive \"{}\"".format(output_archive_name))
+        return archive_file
+
+    config.setWorkingDir(str(pathlib.Path(output_directory).resolve()))
+    if not config.isArchivable():
+        raise ValueError(
+            "The config cannot be archived into \"{}\".".format(archive_file)
+        )
+
+    with instrumentation.span("write archive"):
+        if archive_file.exists():
+            archive_file.unlink()
+        config.archive(str(archive_file))
+    record_artefact(build_manifest, archive_file, inputs)
+    print("Wrote archive \"{}\"".format(output_archive_name))
+
+    return archive_file
+
+
+# Build the complete AgX config and its LUTs into output_directory. The
+# keyword arguments default to the global configuration above, and allow
+# variants of the config to be generated side by side. LUT_inputs, when
+# already computed from the same arguments, saves deriving them again.
+@instrumentation.traced("build_config", label="output_directory")
+def build_config(
+    output_directory=output_config_directory,
+    minimum_ev=AgX_min_EV,
+    maximum_ev=AgX_max_EV,
+    y_pivot=AgX_y_pivot,
+    general_contrast=AgX_general_contrast,
+    limits_contrast=AgX_limits_contrast,
+    compression=AgX_compression,
+    shared_LUT=None,
+    archive=output_config_archive,
+    LUT_inputs=None,
+    flatten=output_config_flatten
+):
     config = PyOpenColorIO.Config()
     config.setMinorVersion(0)
 
@@ -74,13 +303,13 @@ if __name__ == "__main__":
             minOutValue=0.0
         ),
         PyOpenColorIO.MatrixTransform(
-            AgX.shape_OCIO_matrix(AgX.AgX_compressed_matrix())
+            AgX.shape_OCIO_matrix(AgX.AgX_compressed_matrix(compression))
         ),
         PyOpenColorIO.AllocationTransform(
             allocation=PyOpenColorIO.Allocation.ALLOCATION_LG2,
             vars=[
-                AgX.calculate_OCIO_log2(AgX_min_EV),
-                AgX.calculate_OCIO_log2(AgX_max_EV)
+                AgX.calculate_OCIO_log2(minimum_ev),
+                AgX.calculate_OCIO_log2(maximum_ev)
             ]
         )
     ]
@@ -153,11 +382,6 @@ if __name__ == "__main__":
         referencespace=PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
     )
 
-    # TODO: Move this to a different section.
-    AgX.add_view(
-        displays, "sRGB", "Display Native", "sRGB"
-    )
-
     # Add Display P3.
     Display_P3_Colourspace = colour.RGB_COLOURSPACES["Display P3"]
     sRGB_Colourspace = colour.RGB_COLOURSPACES["sRGB"]
@@ -182,11 +406,6 @@ if __name__ == "__main__":
         referencespace=PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
     )
 
-    # TODO: Move this to a different section.
-    AgX.add_view(
-        displays, "Display P3", "Display Native", "Display P3"
-    )
-
     # Add BT.1886.
     transform_list = [
         PyOpenColorIO.ColorSpaceTransform(
@@ -204,11 +423,6 @@ if __name__ == "__main__":
         referencespace=PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
     )
 
-    # TODO: Move this to a different section.
-    AgX.add_view(
-        displays, "BT.1886", "Display Native", "BT.1886"
-    )
-
     ####
     # Views
     ####
@@ -233,244 +447,117 @@ if __name__ == "__main__":
         referencespace=PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
     )
 
-    # TODO: Move this to a different section.
-    AgX.add_view(
-        displays, "sRGB", "AgX", "AgX Base"
-    )
-
-    # Add BT.1886 AgX Kraken aesthetic image base.
-    transform_list = [
-        PyOpenColorIO.ColorSpaceTransform(
-            src="Linear BT.709",
-            dst="AgX Base"
-        ),
-        PyOpenColorIO.ColorSpaceTransform(
-            src="2.2 EOTF Encoding",
-            dst="2.4 EOTF Encoding"
-        )
-    ]
-
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Views/AgX BT.1886",
-        name="AgX Base BT.1886",
-        description="AgX Base Image Encoding for BT.1886 Displays",
-        transforms=transform_list,
-        referencespace=PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
-    )
-
-    # TODO: Move this to a different section.
-    AgX.add_view(
-        displays, "BT.1886", "AgX", "AgX Base BT.1886"
-    )
-
-    # Add Display P3 AgX Kraken aesthetic image base.
-    transform_list = [
-        PyOpenColorIO.ColorSpaceTransform(
-            src="Linear BT.709",
-            dst="AgX Base"
-        ),
-        PyOpenColorIO.ColorSpaceTransform(
-            src="2.2 EOTF Encoding",
-            dst="Display P3"
-        )
-    ]
-
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Views/AgX Display P3",
-        name="AgX Base Display P3",
-        description="AgX Base Image Encoding for Display P3 Displays",
-        transforms=transform_list,
-        referencespace=PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
-    )
-
-    # TODO: Move this to a different section.
-    AgX.add_view(
-        displays, "Display P3", "AgX", "AgX Base Display P3"
-    )
-
-####
-# Appearances / Looks
-####
-
-    # Add a heavily tinted washed look.
-    # Golden Kraken
-    transform_list = [
-        PyOpenColorIO.CDLTransform(
-            slope=[1.0, 0.9, 0.5],
-            power=[0.8, 0.8, 0.8],
-            sat=1.3
-        )
-    ]
-
-    config, look = AgX.add_look(
-        config=config,
-        name="Golden",
-        description="A golden tinted, slightly washed look",
-        transforms=transform_list
-    )
-
-    # Add a crunchier and more saturated look.
-    # Punchy Kraken
-    transform_list = [
-        PyOpenColorIO.CDLTransform(
-            slope=[1.0, 1.0, 1.0],
-            power=[1.35, 1.35, 1.35],
-            sat=1.4
-        )
-    ]
-
-    config, colourspace = AgX.add_look(
-        config=config,
-        name="Punchy",
-        description="A punchy and more chroma laden look",
-        transforms=transform_list
-    )
-
-    # Add Golden for all displays.
-    # sRGB
-    transform_list = [
-        PyOpenColorIO.LookTransform(
-            src="Linear BT.709",
-            dst="AgX Base",
-            looks="Golden"
-        )
-    ]
-
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Appearances/Golden",
-        name="Appearance Golden sRGB",
-        description="A golden tinted, slightly washed look for sRGB displays",
-        transforms=transform_list
-    )
-
-    AgX.add_view(
-        displays, "sRGB", "Appearance Golden", "Appearance Golden sRGB"
-    )
-
-    # Display P3
-    transform_list = [
-        PyOpenColorIO.LookTransform(
-            src="Linear BT.709",
-            dst="AgX Base",
-            looks="Golden"
-        ),
-        PyOpenColorIO.ColorSpaceTransform(
-            src="2.2 EOTF Encoding",
-            dst="Display P3"
-        )
-    ]
-
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Appearances/Golden",
-        name="Appearance Golden Display P3",
-        description="A golden tinted, slightly washed look for Display P3 displays",
-        transforms=transform_list
-    )
-
-    AgX.add_view(
-        displays, "Display P3", "Appearance Golden", "Appearance Golden Display P3"
-    )
+    ####
+    # Appearances / Looks
+    ####
 
-    # Display BT.1886
-    transform_list = [
-        PyOpenColorIO.LookTransform(
-            src="Linear BT.709",
-            dst="AgX Base",
-            looks="Golden"
-        ),
-        PyOpenColorIO.ColorSpaceTransform(
-            src="2.2 EOTF Encoding",
-            dst="2.4 EOTF Encoding"
+    for look_name, look in supported_looks.items():
+        config, _ = AgX.add_look(
+            config=config,
+            name=look_name,
+            description=look["description"],
+            transforms=[
+                PyOpenColorIO.CDLTransform(
+                    slope=look["slope"],
+                    power=look["power"],
+                    sat=look["sat"]
+                )
+            ]
         )
-    ]
 
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Appearances/Golden",
-        name="Appearance Golden BT.1886",
-        description="A golden tinted, slightly washed look for BT.1886 displays",
-        transforms=transform_list
-    )
-
-    AgX.add_view(
-        displays, "BT.1886", "Appearance Golden", "Appearance Golden BT.1886"
-    )
-
-    # Add Punchy for all displays.
-    # sRGB
-    transform_list = [
-        PyOpenColorIO.LookTransform(
-            src="Linear BT.709",
-            dst="AgX Base",
-            looks="Punchy"
+        config, _ = AgX.add_named_transform(
+            config=config,
+            family="Appearances",
+            name="Appearance {}".format(look_name),
+            description="{} over AgX Base".format(look["description"]),
+            transforms=[
+                PyOpenColorIO.LookTransform(
+                    src="Linear BT.709",
+                    dst="AgX Base",
+                    looks=look_name
+                )
+            ]
         )
-    ]
-
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Appearances/Punchy",
-        name="Appearance Punchy sRGB",
-        description="A punchy and more chroma laden look for sRGB displays",
-        transforms=transform_list
-    )
 
-    AgX.add_view(
-        displays, "sRGB", "Appearance Punchy", "Appearance Punchy sRGB"
-    )
+    ####
+    # Display Encodings
+    ####
 
-    # Display P3
-    transform_list = [
-        PyOpenColorIO.LookTransform(
-            src="Linear BT.709",
-            dst="AgX Base",
-            looks="Punchy"
-        ),
-        PyOpenColorIO.ColorSpaceTransform(
-            src="2.2 EOTF Encoding",
-            dst="Display P3"
+    for display, specification in supported_displays.items():
+        if specification["encoding"] is None:
+            continue
+
+        encoding_src, encoding_dst = specification["encoding"]
+        config, _ = AgX.add_named_transform(
+            config=config,
+            family="Utilities/Display Encodings",
+            name="AgX Base to {}".format(display),
+            description="Re-encodes AgX Base for {} Displays".format(display),
+            transforms=[
+                PyOpenColorIO.ColorSpaceTransform(
+                    src=encoding_src,
+                    dst=encoding_dst
+                )
+            ]
         )
-    ]
-
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Appearances/Punchy",
-        name="Appearance Punchy Display P3",
-        description="A punchy and more chroma laden look for Display P3 displays",
-        transforms=transform_list
-    )
 
-    AgX.add_view(
-        displays, "Display P3", "Appearance Punchy", "Appearance Punchy Display P3"
-    )
+    ####
+    # Display / View / Look Matrix
+    ####
 
-    # Display BT.1886
-    transform_list = [
-        PyOpenColorIO.LookTransform(
-            src="Linear BT.709",
-            dst="AgX Base",
-            looks="Punchy"
-        ),
-        PyOpenColorIO.ColorSpaceTransform(
-            src="2.2 EOTF Encoding",
-            dst="2.4 EOTF Encoding"
+    for display, specification in supported_displays.items():
+        AgX.add_view(
+            displays, display, "Display Native", specification["colourspace"]
         )
-    ]
 
-    config, colourspace = AgX.add_colourspace(
-        config=config,
-        family="Appearances/Punchy",
-        name="Appearance Punchy BT.1886",
-        description="A punchy and more chroma laden look for BT.1886 displays",
-        transforms=transform_list
-    )
+        if specification["encoding"] is None:
+            encoding = []
+        else:
+            encoding = [
+                AgX.use_named_transform("AgX Base to {}".format(display))
+            ]
 
-    AgX.add_view(
-        displays, "BT.1886", "Appearance Punchy", "Appearance Punchy BT.1886"
-    )
+        # AgX Base itself is encoded for 2.2 exponent displays.
+        if encoding:
+            config, _ = AgX.add_colourspace(
+                config=config,
+                family="Views/AgX {}".format(display),
+                name="AgX Base {}".format(display),
+                description="AgX Base Image Encoding for {} Displays".format(
+                    display
+                ),
+                transforms=[
+                    PyOpenColorIO.ColorSpaceTransform(
+                        src="Linear BT.709",
+                        dst="AgX Base"
+                    )
+                ] + encoding,
+                referencespace=(
+                    PyOpenColorIO.ReferenceSpaceType.REFERENCE_SPACE_SCENE
+                )
+            )
+            AgX.add_view(displays, display, "AgX", "AgX Base {}".format(
+                display
+            ))
+        else:
+            AgX.add_view(displays, display, "AgX", "AgX Base")
+
+        for look_name, look in supported_looks.items():
+            appearance = "Appearance {}".format(look_name)
+            config, _ = AgX.add_colourspace(
+                config=config,
+                family="Appearances/{}".format(look_name),
+                name="{} {}".format(appearance, display),
+                description="{} for {} displays".format(
+                    look["description"], display
+                ),
+                transforms=[AgX.use_named_transform(appearance)] + encoding
+            )
+            AgX.add_view(
+                displays, display, appearance, "{} {}".format(
+                    appearance, display
+                )
+            )
 
     ####
     # Data
@@ -489,35 +576,39 @@ if __name__ == "__main__":
     # Creative Looks LUTs
     ###
 
-    x_input = numpy.linspace(0.0, 1.0, 4096)
-    limits_contrast = [3.0, 3.25]
-    general_contrast = 2.0
-    y_LUT = AgX.equation_full_curve(
-        x_input,
-        AgX_x_pivot,
-        AgX_y_pivot,
-        general_contrast,
-        limits_contrast
-    )
+    output_directory = pathlib.Path(output_directory)
+    build_manifest = load_build_manifest(output_directory)
 
     aesthetic_LUT_name = "AgX Default Contrast"
     aesthetic_LUT_safe = aesthetic_LUT_name.replace(" ", "_")
-    aesthetic_LUT = colour.LUT1D(
-        table=y_LUT,
-        name="AgX Default Contrast"
-    )
-
-    try:
-        output_directory = pathlib.Path(output_config_directory)
-        LUTs_directory = output_directory / output_LUTs_directory
-        LUT_filename = pathlib.Path(
-            LUTs_directory / "{}.spi1d".format(aesthetic_LUT_safe)
+    LUTs_directory = output_directory / output_LUTs_directory
+    LUT_filename = pathlib.Path(
+        LUTs_directory / "{}.spi1d".format(aesthetic_LUT_safe)
+    )
+
+    if LUT_inputs is None:
+        LUT_inputs = contrast_LUT_inputs(
+            minimum_ev,
+            maximum_ev,
+            y_pivot,
+            general_contrast,
+            limits_contrast
         )
-        LUTs_directory.mkdir(parents=True, exist_ok=True)
-        colour.io.luts.write_LUT(aesthetic_LUT, LUT_filename, method="Sony SPI1D")
 
-    except Exception as ex:
-        raise ex
+    if artefact_is_current(build_manifest, LUT_filename, LUT_inputs):
+        print("Skipped unchanged LUT \"{}\"".format(LUT_filename.name))
+    else:
+        try:
+            # A LUT already built for identical inputs is linked, not rebuilt.
+            if shared_LUT is not None:
+                LUTs_directory.mkdir(parents=True, exist_ok=True)
+                link_file(shared_LUT, LUT_filename)
+            else:
+                write_contrast_LUT(LUT_filename, LUT_inputs)
+            record_artefact(build_manifest, LUT_filename, LUT_inputs)
+
+        except Exception as ex:
+            raise ex
 
     ####
     # Config Generation
@@ -558,19 +649,51 @@ if __name__ == "__main__":
             )
 
     try:
-        config.validate()
+        with instrumentation.span("validate"):
+            config.validate()
+
+        if flatten:
+            with instrumentation.span("flatten"):
+                config = flatten_config.flatten_views(config)
+                config.validate()
 
-        output_directory = pathlib.Path(output_config_directory)
         output_directory.mkdir(parents=True, exist_ok=True)
         output_file = output_directory / output_config_name
 
-        write_file = open(output_file, "w")
-        write_file.write(config.serialize())
-        write_file.close()
-        print("Wrote config \"{}\"".format(output_config_name))
+        # The serialised config captures every matrix and transform list.
+        with instrumentation.span("serialize"):
+            serialized_config = config.serialize()
+        if artefact_is_current(
+            build_manifest, output_file, serialized_config
+        ):
+            print("Skipped unchanged config \"{}\"".format(
+                output_config_name
+            ))
+        else:
+            with instrumentation.span("write config"):
+                write_file = open(output_file, "w")
+                write_file.write(serialized_config)
+                write_file.close()
+            record_artefact(build_manifest, output_file, serialized_config)
+            print("Wrote config \"{}\"".format(output_config_name))
+
+        if archive:
+            write_config_archive(
+                config,
+                output_directory,
+                build_manifest,
+                {
+                    "config": serialized_config,
+                    "LUT": hash_file(LUT_filename)
+                }
+            )
+
+        write_build_manifest(output_directory, build_manifest)
     except Exception as ex:
         raise ex
 
+    return output_file
+
     # print(config)
 #     in_xy_D65 = models.sRGB_COLOURSPACE.whitepoint
 
@@ -836,4 +959,40 @@ if __name__ == "__main__":
 #         write_file.close()
 #         print("Wrote config \"{}\"".format(output_config_name))
 #     except Exception as ex:
-#         raise ex
\ No newline at end of file
+#         raise ex
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the AgX config.")
+    parser.add_argument(
+        "--report", default=None,
+        help="Write a JSON report of the time spent in each build phase."
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Include a cProfile summary in the report."
+    )
+    parser.add_argument(
+        "--flatten", action="store_true", default=output_config_flatten,
+        help="Flatten the colourspace of every view into a single group."
+    )
+    parser.add_argument(
+        "--archive", action="store_true", default=output_config_archive,
+        help="Also package the config and its LUTs as \"{}\".".format(
+            output_archive_name
+        )
+    )
+    args = parser.parse_args()
+
+    if args.report is not None:
+        instrumentation.enabled = True
+        instrumentation.record_span("import", import_start, import_stop)
+        if args.profile:
+            instrumentation.start_profile()
+
+    build_config(archive=args.archive, flatten=args.flatten)
+
+    if args.report is not None:
+        instrumentation.stop_profile()
+        instrumentation.write_report(args.report)
+        print("Wrote report \"{}\"".format(args.report))
@@ -0,0 +1,138 @@
+import contextlib
+import cProfile
+import functools
+import json
+import pstats
+import time
+
+####
+# Global Configuration Variables
+####
+enabled = False
+profile_limit = 50
+
+# Recorded state for the current build.
+origin = time.perf_counter()
+spans = []
+stack = []
+profiler = None
+
+
+def reset():
+    global origin, profiler
+
+    origin = time.perf_counter()
+    spans.clear()
+    stack.clear()
+    profiler = None
+
+
+def record_span(name, start, stop, /, **attributes):
+    if not enabled:
+        return
+
+    spans.append({
+        "name": name,
+        "parent": stack[-1] if stack else None,
+        "depth": len(stack),
+        "start": start - origin,
+        "seconds": stop - start,
+        "attributes": attributes
+    })
+
+
+# Time the enclosed block as a named span. Spans nest, and are recorded only
+# while instrumentation is enabled.
+@contextlib.contextmanager
+def span(name, /, **attributes):
+    if not enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    stack.append(name)
+    try:
+        yield
+    finally:
+        stack.pop()
+        record_span(name, start, time.perf_counter(), **attributes)
+
+
+# Decorate a function so every call is recorded as a span, labelled by the
+# value of the given keyword argument when one is passed.
+def traced(name, label=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            attributes = {}
+            if label is not None and label in kwargs:
+                attributes[label] = kwargs[label]
+
+            with span(name, **attributes):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def start_profile():
+    global profiler
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+
+def stop_profile():
+    if profiler is not None:
+        profiler.disable()
+
+
+def profile_summary(limit=profile_limit):
+    if profiler is None:
+        return None
+
+    statistics = pstats.Stats(profiler)
+    rows = []
+    for function, (calls, _, total, cumulative, _) in statistics.stats.items():
+        filename, line, function_name = function
+        rows.append({
+            "function": "{}:{}({})".format(filename, line, function_name),
+            "calls": calls,
+            "total_seconds": total,
+            "cumulative_seconds": cumulative
+        })
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+
+    return rows[:limit]
+
+
+# Summarise the recorded spans, totalled per name, alongside the raw spans
+# and the optional profile.
+def report():
+    phases = {}
+    for recorded in spans:
+        phase = phases.setdefault(
+            recorded["name"], {"count": 0, "seconds": 0.0}
+        )
+        phase["count"] += 1
+        phase["seconds"] += recorded["seconds"]
+
+    # Spans recorded before instrumentation was imported, such as the import
+    # itself, extend the total.
+    start = min([recorded["start"] for recorded in spans] + [0.0])
+
+    return {
+        "total_seconds": time.perf_counter() - origin - start,
+        "phases": phases,
+        "spans": sorted(spans, key=lambda recorded: recorded["start"]),
+        "profile": profile_summary()
+    }
+
+
+def write_report(path):
+    with open(path, "w") as report_file:
+        json.dump(report(), report_file, indent=2)
@@ -0,0 +1,297 @@
+import collections
+import copy
+import hashlib
+import threading
+import time
+import weakref
+import numpy
+import PyOpenColorIO
+
+####
+# Global Configuration Variables
+####
+cache_size = 64
+
+# Cached processors, least recently used first, keyed by the config cache ID
+# and everything identifying the transform chain. The last cache ID seen for
+# each config is held weakly, so it goes when the config does.
+processors = collections.OrderedDict()
+config_cache_IDs = weakref.WeakKeyDictionary()
+counters = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "invalidations": 0,
+    "build_seconds": 0.0
+}
+lock = threading.RLock()
+
+
+# Drop every cached processor built from an earlier state of a config, so a
+# modified config never leaves stale processors behind.
+def track_config(config):
+    cache_ID = config.getCacheID()
+    previous_cache_ID = config_cache_IDs.get(config)
+
+    if previous_cache_ID is not None and previous_cache_ID != cache_ID:
+        invalidate(cache_ID=previous_cache_ID)
+    config_cache_IDs[config] = cache_ID
+
+    return cache_ID
+
+
+def invalidate(config=None, cache_ID=None):
+    with lock:
+        if config is not None:
+            cache_ID = config_cache_IDs.pop(config, config.getCacheID())
+
+        for key in list(processors):
+            if cache_ID is None or key[0] == cache_ID:
+                del processors[key]
+                counters["invalidations"] += 1
+
+
+def statistics():
+    with lock:
+        return dict(counters, size=len(processors), capacity=cache_size)
+
+
+# Lookups made on the way to another cached value pass count=False, so that
+# each request counts as a single hit or miss.
+def cached(key, build, count=True):
+    with lock:
+        if key in processors:
+            processors.move_to_end(key)
+            if count:
+                counters["hits"] += 1
+            return processors[key]
+        if count:
+            counters["misses"] += 1
+
+    start = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - start
+
+    with lock:
+        counters["build_seconds"] += seconds
+        processors[key] = value
+        processors.move_to_end(key)
+        while len(processors) > cache_size:
+            processors.popitem(last=False)
+            counters["evictions"] += 1
+
+    return value
+
+
+def build_processor(
+    config,
+    src=None,
+    dst=None,
+    looks=None,
+    display=None,
+    view=None,
+    transform=None
+):
+    # OCIO's own processor cache also keys explicit transforms by their
+    # rounded string form, so they are built from a copy that bypasses it.
+    if transform is not None:
+        uncached_config = copy.deepcopy(config)
+        uncached_config.setProcessorCacheFlags(
+            PyOpenColorIO.ProcessorCacheFlags.PROCESSOR_CACHE_OFF
+        )
+        return uncached_config.getProcessor(transform)
+
+    if display is not None:
+        pipeline = PyOpenColorIO.LegacyViewingPipeline()
+        pipeline.setDisplayViewTransform(
+            PyOpenColorIO.DisplayViewTransform(
+                src=src,
+                display=display,
+                view=view
+            )
+        )
+        if looks is not None:
+            pipeline.setLooksOverride(looks)
+            pipeline.setLooksOverrideEnabled(True)
+
+        return pipeline.getProcessor(config)
+
+    if looks is not None:
+        return config.getProcessor(
+            PyOpenColorIO.LookTransform(src=src, dst=dst, looks=looks)
+        )
+
+    return config.getProcessor(src, dst)
+
+
+# Getters that describe a transform without affecting what it computes.
+transform_key_ignored = ("getFormatMetadata", "getFormats")
+
+
+# A hashable key holding the exact values of an explicit transform, read
+# through its getters. The string form of a transform rounds its values, so
+# transforms differing past that precision would share a processor.
+def transform_key(transform):
+    if isinstance(transform, PyOpenColorIO.GroupTransform):
+        return (
+            "GroupTransform",
+            str(transform.getDirection()),
+            tuple(transform_key(child) for child in transform)
+        )
+
+    values = [type(transform).__name__]
+    for name in sorted(dir(transform)):
+        if not name.startswith("get") or name in transform_key_ignored:
+            continue
+        try:
+            value = getattr(transform, name)()
+        except TypeError:
+            # Getters taking an index, such as a LUT's getValue, are covered
+            # by getData.
+            continue
+        values.append((name, frozen_value(value)))
+
+    return tuple(values)
+
+
+# Floats are keyed by their exact hexadecimal form, LUT data by a digest, and
+# grading values, which are plain objects, by their attributes and getters.
+def frozen_value(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return value.hex()
+    if isinstance(value, numpy.ndarray):
+        return (
+            value.shape,
+            value.dtype.str,
+            hashlib.sha256(numpy.ascontiguousarray(value)).hexdigest()
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(frozen_value(item) for item in value)
+    if isinstance(value, PyOpenColorIO.Transform):
+        return transform_key(value)
+    if hasattr(type(value), "__members__"):
+        return str(value)
+    if hasattr(value, "__iter__"):
+        return tuple(frozen_value(item) for item in value)
+
+    values = []
+    for name in sorted(dir(value)):
+        if name.startswith("_") or name[0].isupper():
+            continue
+        attribute = getattr(value, name)
+        if callable(attribute):
+            if not name.startswith("get"):
+                continue
+            try:
+                attribute = attribute()
+            except TypeError:
+                continue
+        values.append((name, frozen_value(attribute)))
+
+    return (type(value).__name__, tuple(values))
+
+
+# Everything identifying the transform chain, led by the config cache ID.
+def processor_key(config, src, dst, looks, display, view, transform):
+    return (
+        track_config(config),
+        src,
+        dst,
+        looks,
+        display,
+        view,
+        None if transform is None else transform_key(transform)
+    )
+
+
+def lookup_processor(
+    key,
+    config,
+    src,
+    dst,
+    looks,
+    display,
+    view,
+    transform,
+    count=True
+):
+    return cached(key + ("processor",), lambda: build_processor(
+        config, src, dst, looks, display, view, transform
+    ), count)
+
+
+# Fetch the processor for a colourspace conversion, a display / view with
+# optional looks, or an explicit transform, building it only on a miss.
+def get_processor(
+    config,
+    src=None,
+    dst=None,
+    looks=None,
+    display=None,
+    view=None,
+    transform=None
+):
+    return lookup_processor(
+        processor_key(config, src, dst, looks, display, view, transform),
+        config,
+        src,
+        dst,
+        looks,
+        display,
+        view,
+        transform
+    )
+
+
+def get_CPU_processor(
+    config,
+    src=None,
+    dst=None,
+    looks=None,
+    display=None,
+    view=None,
+    transform=None,
+    optimization=None
+):
+    # Keyed by the request rather than the processor cache ID, which OCIO
+    # also derives from the rounded string form of explicit transforms.
+    key = processor_key(config, src, dst, looks, display, view, transform)
+    processor = lookup_processor(
+        key, config, src, dst, looks, display, view, transform, count=False
+    )
+    key += ("cpu", None if optimization is None else int(optimization))
+
+    if optimization is None:
+        return cached(key, processor.getDefaultCPUProcessor)
+
+    return cached(key, lambda: processor.getOptimizedCPUProcessor(
+        optimization
+    ))
+
+
+def get_GPU_processor(
+    config,
+    src=None,
+    dst=None,
+    looks=None,
+    display=None,
+    view=None,
+    transform=None,
+    optimization=None
+):
+    # Keyed by the request rather than the processor cache ID, which OCIO
+    # also derives from the rounded string form of explicit transforms.
+    key = processor_key(config, src, dst, looks, display, view, transform)
+    processor = lookup_processor(
+        key, config, src, dst, looks, display, view, transform, count=False
+    )
+    key += ("gpu", None if optimization is None else int(optimization))
+
+    if optimization is None:
+        return cached(key, processor.getDefaultGPUProcessor)
+
+    return cached(key, lambda: processor.getOptimizedGPUProcessor(
+        optimization
+    ))
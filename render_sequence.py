@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing.shared_memory
+import numpy
+import os
+import pathlib
+import AgX
+
+####
+# Global Configuration Variables
+####
+output_directory = "./render/"
+manifest_name = "render_manifest.json"
+
+# Per process state, established once by the pool initialiser.
+worker_state = {}
+
+
+def initialise_worker(parameters):
+    # Build the inset matrix once per worker rather than once per frame.
+    parameters = dict(parameters)
+    parameters["matrix"] = AgX.AgX_compressed_matrix(
+        parameters.pop("compression")
+    )
+    parameters["workers"] = 1
+
+    worker_state["parameters"] = parameters
+
+
+def render_frame(name, shape, dtype, output_path):
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not take ownership of the block away from the parent.
+    shared_memory = multiprocessing.shared_memory.SharedMemory(name=name)
+    try:
+        frame = numpy.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+
+        # Render in place when the working precision allows it.
+        out = frame if AgX.resolve_dtype(frame) == frame.dtype else None
+        out = AgX.render_image(frame, out=out, **worker_state["parameters"])
+
+        temporary_path = output_path.with_suffix(".tmp.npy")
+        numpy.save(temporary_path, out)
+        os.replace(temporary_path, output_path)
+
+        del frame, out
+    finally:
+        shared_memory.close()
+
+    return output_path
+
+
+def release_shared_memory(shared_memory):
+    shared_memory.close()
+    shared_memory.unlink()
+
+
+def parameters_hash(parameters):
+    return hashlib.sha256(
+        json.dumps(parameters, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def frame_signature(path):
+    stat = path.stat()
+
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_manifest(path, parameters):
+    try:
+        with open(path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        manifest = {}
+
+    # Changed rendering parameters invalidate every finished frame.
+    if manifest.get("parameters") != parameters_hash(parameters):
+        manifest = {"parameters": parameters_hash(parameters), "frames": {}}
+
+    return manifest
+
+
+def write_manifest(path, manifest):
+    temporary_path = path.with_suffix(".tmp")
+    with open(temporary_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(temporary_path, path)
+
+
+# Render a frame sequence across a process pool. Frames are handed to the
+# workers through shared memory, and a manifest in the output directory
+# records finished frames so an interrupted job resumes where it stopped.
+def render_sequence(
+    input_paths,
+    output_directory=output_directory,
+    workers=None,
+    shape=None,
+    file_dtype=numpy.float32,
+    layout="interleaved",
+    parameters=None
+):
+    parameters = dict(parameters or {})
+    parameters.setdefault("compression", 0.20)
+
+    output_directory = pathlib.Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_directory / manifest_name
+    manifest = load_manifest(manifest_path, parameters)
+
+    # Outputs are named by the input stem, so inputs sharing a stem would
+    # overwrite each other and both be recorded as finished.
+    output_paths = {}
+    for input_path in map(pathlib.Path, input_paths):
+        output_path = output_directory / "{}.npy".format(input_path.stem)
+        if output_path in output_paths:
+            raise ValueError(
+                "Inputs \"{}\" and \"{}\" both render to \"{}\".".format(
+                    output_paths[output_path], input_path, output_path
+                )
+            )
+        output_paths[output_path] = input_path
+
+    pending = []
+    for output_path, input_path in output_paths.items():
+        record = manifest["frames"].get(str(input_path))
+        if record == frame_signature(input_path) and output_path.exists():
+            continue
+        pending.append((input_path, output_path))
+
+    print("Rendering {} of {} frames".format(len(pending), len(input_paths)))
+
+    workers = workers or os.cpu_count() or 1
+    in_flight = {}
+
+    # Blocks still in flight when a frame fails are released once the pool
+    # has shut down, so a failed render leaves nothing in shared memory.
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=initialise_worker,
+            initargs=(parameters,)
+        ) as executor:
+            pending.reverse()
+            while pending or in_flight:
+                # Keep at most two frames per worker resident in shared
+                # memory.
+                while pending and len(in_flight) < 2 * workers:
+                    input_path, output_path = pending.pop()
+                    frame = AgX.open_image_memmap(
+                        input_path, shape, file_dtype, layout
+                    )
+                    if layout == "planar":
+                        frame = frame.transpose(1, 2, 0)
+
+                    shared_memory = (
+                        multiprocessing.shared_memory.SharedMemory(
+                            create=True, size=max(frame.nbytes, 1)
+                        )
+                    )
+                    try:
+                        numpy.copyto(
+                            numpy.ndarray(
+                                frame.shape, dtype=frame.dtype,
+                                buffer=shared_memory.buf
+                            ),
+                            frame
+                        )
+                        future = executor.submit(
+                            render_frame,
+                            shared_memory.name,
+                            frame.shape,
+                            frame.dtype.str,
+                            output_path
+                        )
+                    except BaseException:
+                        release_shared_memory(shared_memory)
+                        raise
+                    in_flight[future] = (input_path, shared_memory)
+                    del frame
+
+                done, _ = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    input_path, shared_memory = in_flight.pop(future)
+                    release_shared_memory(shared_memory)
+
+                    output_path = future.result()
+                    manifest["frames"][str(input_path)] = frame_signature(
+                        input_path
+                    )
+                    write_manifest(manifest_path, manifest)
+                    print("Rendered \"{}\"".format(output_path))
+    finally:
+        for _, shared_memory in in_flight.values():
+            release_shared_memory(shared_memory)
+        in_flight.clear()
+
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render a frame sequence through AgX Base."
+    )
+    parser.add_argument(
+        "inputs", nargs="+",
+        help="Input frames, as .npy or raw files."
+    )
+    parser.add_argument("--output-directory", default=output_directory)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--shape", type=int, nargs=3, metavar=("HEIGHT", "WIDTH", "CHANNELS"),
+        help="Shape of raw input frames."
+    )
+    parser.add_argument(
+        "--file-dtype", default="float32",
+        help="Data type of raw input frames."
+    )
+    parser.add_argument(
+        "--layout", choices=["interleaved", "planar"], default="interleaved"
+    )
+    parser.add_argument("--compression", type=float, default=0.20)
+    parser.add_argument("--minimum-ev", type=float, default=-10.0)
+    parser.add_argument("--maximum-ev", type=float, default=+6.5)
+    parser.add_argument("--display-exponent", type=float, default=2.2)
+    parser.add_argument(
+        "--curve-mode",
+        choices=["exact"] + list(AgX.curve_LUT_interpolations),
+        default="exact",
+        help="Evaluate the sigmoid analytically or from a curve LUT."
+    )
+    args = parser.parse_args()
+
+    render_sequence(
+        sorted(args.inputs),
+        output_directory=args.output_directory,
+        workers=args.workers,
+        shape=args.shape,
+        file_dtype=numpy.dtype(args.file_dtype),
+        layout=args.layout,
+        parameters={
+            "compression": args.compression,
+            "minimum_ev": args.minimum_ev,
+            "maximum_ev": args.maximum_ev,
+            "display_exponent": args.display_exponent,
+            "curve_mode": args.curve_mode
+        }
+    )
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import pathlib
+import generate_config
+
+####
+# Global Configuration Variables
+####
+output_sweep_directory = "./sweep/"
+shared_LUTs_directory = "./shared_LUTs/"
+sweep_index_name = "sweep.json"
+
+
+# Expand a grid, mapping build_config keyword arguments to lists of values,
+# into every combination of those values.
+def sweep_variants(grid):
+    names = sorted(grid)
+
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def variant_name(parameters):
+    return "_".join(
+        "{}_{}".format(
+            name,
+            "-".join(map(str, value))
+            if isinstance(value, (list, tuple)) else value
+        )
+        for name, value in sorted(parameters.items())
+    )
+
+
+def variant_LUT_inputs(parameters):
+    return generate_config.contrast_LUT_inputs(
+        parameters.get("minimum_ev", generate_config.AgX_min_EV),
+        parameters.get("maximum_ev", generate_config.AgX_max_EV),
+        parameters.get("y_pivot", generate_config.AgX_y_pivot),
+        parameters.get(
+            "general_contrast", generate_config.AgX_general_contrast
+        ),
+        parameters.get(
+            "limits_contrast", generate_config.AgX_limits_contrast
+        )
+    )
+
+
+# Build a LUT once into the shared directory, named by the hash of its inputs.
+def build_shared_LUT(directory, inputs):
+    LUT_filename = pathlib.Path(directory) / "{}.spi1d".format(
+        generate_config.hash_inputs(inputs)
+    )
+
+    if not LUT_filename.exists():
+        temporary_filename = LUT_filename.with_suffix(".tmp.spi1d")
+        generate_config.write_contrast_LUT(temporary_filename, inputs)
+        os.replace(temporary_filename, LUT_filename)
+
+    return LUT_filename
+
+
+def build_variant(output_directory, parameters, shared_LUT, LUT_inputs):
+    return generate_config.build_config(
+        output_directory=output_directory,
+        shared_LUT=shared_LUT,
+        LUT_inputs=LUT_inputs,
+        **parameters
+    )
+
+
+# Generate a config for every variant in the grid across a process pool, each
+# into its own directory. LUTs are deduplicated: the inputs of every variant
+# are derived once, and every distinct curve is built once and linked into the
+# variants that use it.
+def sweep_config(grid, output_directory=output_sweep_directory, workers=None):
+    output_directory = pathlib.Path(output_directory)
+    LUTs_directory = output_directory / shared_LUTs_directory
+    LUTs_directory.mkdir(parents=True, exist_ok=True)
+
+    variants = []
+    LUT_inputs = {}
+    for parameters in sweep_variants(grid):
+        inputs = variant_LUT_inputs(parameters)
+        LUT_hash = generate_config.hash_inputs(inputs)
+        LUT_inputs.setdefault(LUT_hash, inputs)
+        variants.append((parameters, LUT_hash))
+
+    print("Building {} variants sharing {} LUTs".format(
+        len(variants), len(LUT_inputs)
+    ))
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        shared_LUTs = dict(zip(
+            LUT_inputs,
+            executor.map(
+                build_shared_LUT,
+                itertools.repeat(LUTs_directory),
+                LUT_inputs.values()
+            )
+        ))
+
+        futures = {}
+        for parameters, LUT_hash in variants:
+            variant_directory = output_directory / variant_name(parameters)
+            future = executor.submit(
+                build_variant,
+                variant_directory,
+                parameters,
+                shared_LUTs[LUT_hash],
+                LUT_inputs[LUT_hash]
+            )
+            futures[future] = (variant_directory, parameters)
+
+        index = {}
+        for future in concurrent.futures.as_completed(futures):
+            variant_directory, parameters = futures[future]
+            future.result()
+            index[variant_directory.name] = parameters
+
+    with open(output_directory / sweep_index_name, "w") as index_file:
+        json.dump(index, index_file, indent=2, sort_keys=True)
+
+    return index
+
+
+def parse_limits_contrast(value):
+    return [float(limit) for limit in value.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate AgX config variants over a parameter grid."
+    )
+    parser.add_argument(
+        "--minimum-ev", type=float, nargs="+",
+        default=[generate_config.AgX_min_EV]
+    )
+    parser.add_argument(
+        "--maximum-ev", type=float, nargs="+",
+        default=[generate_config.AgX_max_EV]
+    )
+    parser.add_argument(
+        "--general-contrast", type=float, nargs="+",
+        default=[generate_config.AgX_general_contrast]
+    )
+    parser.add_argument(
+        "--limits-contrast", type=parse_limits_contrast, nargs="+",
+        default=[generate_config.AgX_limits_contrast],
+        help="Toe and shoulder powers as comma separated pairs, e.g. 3.0,3.25"
+    )
+    parser.add_argument(
+        "--compression", type=float, nargs="+",
+        default=[generate_config.AgX_compression]
+    )
+    parser.add_argument("--output-directory", default=output_sweep_directory)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    sweep_config(
+        {
+            "minimum_ev": args.minimum_ev,
+            "maximum_ev": args.maximum_ev,
+            "general_contrast": args.general_contrast,
+            "limits_contrast": args.limits_contrast,
+            "compression": args.compression
+        },
+        output_directory=args.output_directory,
+        workers=args.workers
+    )